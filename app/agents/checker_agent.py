@@ -19,8 +19,8 @@ class CheckerAgent:
     Ensures content safety and appropriateness for parenting context
     """
 
-    def __init__(self):
-        self.client = OpenAIClient()
+    def __init__(self, client: OpenAIClient | None = None):
+        self.client = client or OpenAIClient()
         self.system_prompt = """
         You are a content moderation agent for a parenting advice platform.
         
@@ -1,6 +1,10 @@
 ﻿import logging
 
+from app.core.config import settings
+from app.db import crud
+from app.db.session import ReadSessionLocal
 from app.schemas.message_schema import MessageResponse, MessageUsage
+from app.services.embeddings import EmbeddingService
 from app.services.langgraph_pipeline import LangGraphPipeline
 from app.services.openai_client import OpenAIClient
 from app.services.retrieval import RetrievalService
@@ -14,10 +18,21 @@ class ParentingAgent:
     Combines retrieval, reasoning, and response generation
     """
 
-    def __init__(self):
-        self.client = OpenAIClient()
-        self.retrieval = RetrievalService()
-        self.pipeline = LangGraphPipeline()
+    def __init__(
+        self,
+        client: OpenAIClient | None = None,
+        pipeline: LangGraphPipeline | None = None,
+        retrieval: RetrievalService | None = None,
+    ):
+        self.client = client or OpenAIClient()
+        self.retrieval = retrieval or RetrievalService(
+            embeddings=EmbeddingService(self.client)
+        )
+        self.pipeline = pipeline or LangGraphPipeline(
+            openai_client=self.client,
+            retrieval=self.retrieval,
+            embeddings=self.retrieval.embeddings,
+        )
 
         self.system_prompt = """
         You are a knowledgeable, empathetic parenting advisor with expertise in:
@@ -120,18 +135,20 @@ class ParentingAgent:
         if not conversation_id:
             return []
 
-        # TODO: Implement database retrieval
-        return []
+        async with ReadSessionLocal() as db:
+            messages = await crud.get_conversation_messages(
+                db, conversation_id, limit=settings.chat_history_messages
+            )
+
+        return [{"role": m.role, "content": m.content} for m in messages]
 
     def _format_retrieved_context(self, docs: list[dict]) -> str:
         """Format retrieved documents for prompt context"""
         if not docs:
             return "No specific context found in parenting resources."
 
-        formatted = []
-        for i, doc in enumerate(docs, 1):
-            content = doc.get("content", "")[:500]  # Limit length
-            source = doc.get("source", "Unknown source")
-            formatted.append(f"{i}. {content}... (Source: {source})")
+        # Pack whole documents by token count rather than cutting each one
+        budget = int(settings.prompt_token_budget * settings.prompt_context_share)
+        formatted = self.pipeline.prompt_builder.format_documents(docs, budget)
 
         return "\n".join(formatted)
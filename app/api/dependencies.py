@@ -1 +1,81 @@
-﻿# Add your dependencies here
+﻿from fastapi import Depends, HTTPException, Request
+
+from app.agents.checker_agent import CheckerAgent
+from app.agents.parenting_agent import ParentingAgent
+from app.services.client_registry import ClientRegistry
+from app.services.cost_tracker import CostTracker
+from app.services.history_cache import HistoryCache
+from app.services.idempotency import IdempotencyStore
+from app.services.langgraph_pipeline import LangGraphPipeline
+from app.services.message_writer import MessageWriter
+from app.services.openai_client import OpenAIClient
+
+
+def get_client_registry(request: Request) -> ClientRegistry:
+    """Shared clients created in the application lifespan"""
+    return request.app.state.clients
+
+
+def get_openai_client(
+    registry: ClientRegistry = Depends(get_client_registry),
+) -> OpenAIClient:
+    """Shared, connection-pooled OpenAI client"""
+    if registry.openai is None:
+        raise HTTPException(status_code=503, detail="AI service not configured")
+
+    return registry.openai
+
+
+def get_pipeline(
+    registry: ClientRegistry = Depends(get_client_registry),
+) -> LangGraphPipeline:
+    """Shared chat pipeline"""
+    if registry.pipeline is None:
+        raise HTTPException(status_code=503, detail="AI service not configured")
+
+    return registry.pipeline
+
+
+def get_message_writer(
+    registry: ClientRegistry = Depends(get_client_registry),
+) -> MessageWriter | None:
+    """Write-behind chat message persistence"""
+    return registry.message_writer
+
+
+def get_history_cache(
+    registry: ClientRegistry = Depends(get_client_registry),
+) -> HistoryCache | None:
+    """Recent chat history per conversation"""
+    return registry.history_cache
+
+
+def get_cost_tracker(
+    registry: ClientRegistry = Depends(get_client_registry),
+) -> CostTracker:
+    """Process-wide usage and cache metrics"""
+    return registry.cost_tracker
+
+
+def get_idempotency_store(
+    registry: ClientRegistry = Depends(get_client_registry),
+) -> IdempotencyStore:
+    """Process-wide Idempotency-Key result store"""
+    return registry.idempotency
+
+
+def get_checker_agent(
+    client: OpenAIClient = Depends(get_openai_client),
+) -> CheckerAgent:
+    """Moderation agent using the shared OpenAI client"""
+    return CheckerAgent(client=client)
+
+
+def get_parenting_agent(
+    client: OpenAIClient = Depends(get_openai_client),
+    pipeline: LangGraphPipeline = Depends(get_pipeline),
+) -> ParentingAgent:
+    """Parenting agent using the shared OpenAI client and pipeline"""
+    return ParentingAgent(
+        client=client, pipeline=pipeline, retrieval=pipeline.retrieval
+    )
@@ -0,0 +1,32 @@
+import hashlib
+import json
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    """Strong comparison against an If-None-Match header"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    # Weak validators (W/"...") never match strongly
+    return etag in (tag.strip() for tag in if_none_match.split(","))
+
+
+def etag_response(request: Request, content: Any) -> Response:
+    """
+    JSON response with a strong ETag over its exact bytes; 304 Not Modified
+    without a body if the client already has them
+    """
+    body = json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(body, media_type="application/json", headers=headers)
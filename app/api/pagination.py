@@ -0,0 +1,33 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*keys: datetime | int | None) -> str:
+    """Opaque cursor for the sort keys of the last row of a page"""
+    values = [key.isoformat() if isinstance(key, datetime) else key for key in keys]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def _parse_key(value, type_: type):
+    if value is None:
+        return None
+    if type_ is datetime:
+        return datetime.fromisoformat(value)
+    return type_(value)
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    """Sort keys from encode_cursor, converted to the given types"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(values) != len(types):
+            raise ValueError("wrong number of keys")
+
+        return tuple(
+            _parse_key(value, type_) for value, type_ in zip(values, types, strict=True)
+        )
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
@@ -1,32 +1,217 @@
-﻿import logging
+﻿import hashlib
+import json
+import logging
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
 
+from app.api.dependencies import (
+    get_cost_tracker,
+    get_history_cache,
+    get_idempotency_store,
+    get_message_writer,
+    get_openai_client,
+    get_pipeline,
+)
 from app.core.config import settings
-from app.db.session import get_db
+from app.db import crud
+from app.db.session import ReadSessionLocal
 from app.schemas.message_schema import MessageCreate, MessageResponse, MessageUsage
+from app.services.cost_tracker import CostTracker
+from app.services.history_cache import HistoryCache
+from app.services.idempotency import IdempotencyKeyReusedError, IdempotencyStore
 from app.services.langgraph_pipeline import LangGraphPipeline
+from app.services.message_writer import MessageWriter
+from app.services.openai_client import OpenAIClient
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+def _is_openai_configured() -> bool:
+    """Check if OpenAI is configured with a plausible API key"""
+    cleaned_key = settings.openai_api_key.strip() if settings.openai_api_key else ""
+
+    return not (
+        not cleaned_key
+        or cleaned_key == "your_openai_api_key_here"
+        or not cleaned_key.startswith(("sk-", "sk-proj-"))
+        or len(cleaned_key) < 20  # OpenAI keys are much longer
+    )
+
+
+def _response_model(metadata: dict[str, Any]) -> str:
+    """Model to report for a pipeline result; a failed run is a fallback"""
+    if "error" in metadata:
+        return "error-fallback"
+    return metadata.get("model", "gpt-4o-mini")
+
+
+def _sse_event(event: str, data: dict[str, Any]) -> str:
+    """Format a single Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# Chat opens its own short session rather than using a request-scoped one:
+# responses outlive the request (shielded idempotent runs, streaming bodies)
+# and no connection should be held while the model generates
+
+
+async def _load_history(
+    cache: HistoryCache | None, conversation_id: int | None
+) -> tuple[str | None, list[dict[str, str]]] | None:
+    """
+    The conversation summary and its latest messages not yet folded into it,
+    or None if there is no such conversation
+    """
+    if conversation_id is None:
+        return None
+
+    if cache is not None:
+        cached = cache.get(conversation_id)
+        if cached is not None:
+            return cached
+
+    limit = settings.chat_history_messages
+    try:
+        async with ReadSessionLocal() as db:
+            conversation = await crud.get_conversation(db, conversation_id)
+            if conversation is None:
+                return None
+
+            messages = await crud.get_conversation_messages(
+                db,
+                conversation_id,
+                limit=limit,
+                after_id=conversation.summarized_message_id,
+            )
+    except Exception as e:
+        logger.warning(f"Could not load conversation {conversation_id}: {e}")
+        return None
+
+    history = [{"role": m.role, "content": m.content} for m in messages]
+    if cache is not None:
+        cache.put(
+            conversation_id,
+            conversation.summary,
+            history,
+            complete=len(history) < limit,
+        )
+
+    return conversation.summary, history
+
+
+def _save_turn(
+    writer: MessageWriter | None,
+    cache: HistoryCache | None,
+    conversation_id: int,
+    user_message: str,
+    received_at: datetime,
+    response: str,
+    metadata: dict[str, Any],
+):
+    """
+    Queue both sides of a turn, with the completion's usage, for writing
+
+    The user message is timestamped when the request arrived and the
+    response when it was ready. The turn is cached once queued; the writer
+    invalidates the conversation if the write is dropped.
+    """
+    if writer is None:
+        return
+
+    usage = metadata.get("usage") or {}
+    writer.enqueue(
+        [
+            {
+                "conversation_id": conversation_id,
+                "role": "user",
+                "content": user_message,
+                "model": None,
+                "input_tokens": None,
+                "output_tokens": None,
+                "created_at": received_at,
+            },
+            {
+                "conversation_id": conversation_id,
+                "role": "assistant",
+                "content": response,
+                "model": metadata.get("model"),
+                "input_tokens": usage.get("prompt_tokens"),
+                "output_tokens": usage.get("completion_tokens"),
+                "created_at": datetime.utcnow(),
+            },
+        ]
+    )
+
+    if cache is not None:
+        cache.append(
+            conversation_id,
+            [
+                {"role": "user", "content": user_message},
+                {"role": "assistant", "content": response},
+            ],
+        )
+
+
 @router.post("/chat", response_model=MessageResponse)
-async def chat_endpoint(message: MessageCreate, db: Session = Depends(get_db)):
+async def chat_endpoint(
+    message: MessageCreate,
+    pipeline: LangGraphPipeline = Depends(get_pipeline),
+    writer: MessageWriter | None = Depends(get_message_writer),
+    cache: HistoryCache | None = Depends(get_history_cache),
+    idempotency: IdempotencyStore = Depends(get_idempotency_store),
+    idempotency_key: str | None = Header(
+        default=None, alias="Idempotency-Key", max_length=255
+    ),
+):
     """
     Chat endpoint with LangGraph pipeline and OpenAI integration
+
+    Clients that retry should send an Idempotency-Key header: a retry of a
+    request still in progress waits for the original, and a retry of a
+    completed request gets the stored response without re-running the LLM.
     """
+    received_at = datetime.utcnow()
+    if idempotency_key is None:
+        return await _generate_chat_response(
+            message, pipeline, received_at, writer, cache
+        )
+
+    key = f"{message.user_id}:{idempotency_key}"
+    fingerprint = hashlib.sha256(message.model_dump_json().encode()).hexdigest()
+
     try:
-        # Check if OpenAI is configured with better validation
-        cleaned_key = settings.openai_api_key.strip() if settings.openai_api_key else ""
+        response = await idempotency.run(
+            key,
+            fingerprint,
+            lambda: _generate_chat_response(
+                message, pipeline, received_at, writer, cache
+            ),
+        )
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
 
-        if (
-            not cleaned_key
-            or cleaned_key == "your_openai_api_key_here"
-            or not cleaned_key.startswith(("sk-", "sk-proj-"))
-            or len(cleaned_key) < 20  # OpenAI keys are much longer
-        ):
+    # Don't replay fallbacks; a retry should get another chance
+    if response.model in ("fallback", "error-fallback"):
+        idempotency.forget(key)
+
+    return response
+
+
+async def _generate_chat_response(
+    message: MessageCreate,
+    pipeline: LangGraphPipeline,
+    received_at: datetime,
+    writer: MessageWriter | None = None,
+    cache: HistoryCache | None = None,
+) -> MessageResponse:
+    """Run the chat pipeline and build the API response"""
+    try:
+        if not _is_openai_configured():
             return MessageResponse(
                 content="AI chat is not properly configured. Please contact support.",
                 role="assistant",
@@ -35,17 +220,28 @@ async def chat_endpoint(message: MessageCreate, db: Session = Depends(get_db)):
                 model="fallback",
             )
 
-        # Initialize pipeline
-        pipeline = LangGraphPipeline()
-
-        # TODO: Get conversation history from database
-        conversation_history = []
+        # Summary of older turns plus the recent ones verbatim
+        history = await _load_history(cache, message.conversation_id)
+        summary, conversation_history = history or (None, [])
 
         # Process through pipeline
         result = await pipeline.process_chat(
-            user_message=message.content, conversation_history=conversation_history
+            user_message=message.content,
+            conversation_history=conversation_history,
+            summary=summary,
         )
 
+        if history is not None and "error" not in result.get("metadata", {}):
+            _save_turn(
+                writer,
+                cache,
+                message.conversation_id,
+                message.content,
+                received_at,
+                result["response"],
+                result["metadata"],
+            )
+
         # Build response
         usage = None
         if "usage" in result.get("metadata", {}):
@@ -61,8 +257,9 @@ async def chat_endpoint(message: MessageCreate, db: Session = Depends(get_db)):
             role="assistant",
             conversation_id=message.conversation_id,
             user_id=message.user_id,
-            model=result.get("metadata", {}).get("model", "gpt-4o-mini"),
+            model=_response_model(result.get("metadata", {})),
             usage=usage,
+            retrieved_sources=result.get("metadata", {}).get("retrieved_sources"),
         )
 
         logger.info(f"Chat response generated for user {message.user_id}")
@@ -93,6 +290,98 @@ async def chat_endpoint(message: MessageCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.post("/chat/stream")
+async def chat_stream_endpoint(
+    message: MessageCreate,
+    pipeline: LangGraphPipeline = Depends(get_pipeline),
+    writer: MessageWriter | None = Depends(get_message_writer),
+    cache: HistoryCache | None = Depends(get_history_cache),
+):
+    """
+    Streaming chat endpoint (Server-Sent Events)
+
+    Emits `token` events as the model generates the response, an optional
+    `replace` event if the response has to be swapped out after moderation,
+    and a closing `done` event carrying the model and usage metadata.
+    """
+    received_at = datetime.utcnow()
+
+    async def event_stream() -> AsyncIterator[str]:
+        if not _is_openai_configured():
+            content = "AI chat is not properly configured. Please contact support."
+            yield _sse_event("token", {"content": content})
+            yield _sse_event(
+                "done",
+                {"content": content, "is_safe": True, "model": "fallback"},
+            )
+            return
+
+        history = await _load_history(cache, message.conversation_id)
+        summary, conversation_history = history or (None, [])
+
+        async for event in pipeline.stream_chat(
+            user_message=message.content,
+            conversation_history=conversation_history,
+            summary=summary,
+        ):
+            if event["type"] != "done":
+                yield _sse_event(event["type"], {"content": event["content"]})
+                continue
+
+            metadata = event.get("metadata", {})
+            if history is not None and "error" not in metadata:
+                _save_turn(
+                    writer,
+                    cache,
+                    message.conversation_id,
+                    message.content,
+                    received_at,
+                    event["response"],
+                    metadata,
+                )
+
+            usage = None
+            if "usage" in metadata:
+                usage = MessageUsage(
+                    input_tokens=metadata["usage"]["prompt_tokens"],
+                    output_tokens=metadata["usage"]["completion_tokens"],
+                    total_tokens=metadata["usage"]["total_tokens"],
+                ).model_dump()
+
+            yield _sse_event(
+                "done",
+                {
+                    "content": event["response"],
+                    "is_safe": event["is_safe"],
+                    "conversation_id": message.conversation_id,
+                    "user_id": message.user_id,
+                    "model": _response_model(metadata),
+                    "usage": usage,
+                    "usage_estimated": metadata.get("usage_estimated", False),
+                },
+            )
+
+        logger.info(f"Chat response streamed for user {message.user_id}")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering
+        },
+    )
+
+
+@router.get("/chat/usage")
+async def chat_usage(cost_tracker: CostTracker = Depends(get_cost_tracker)):
+    """API usage, cost and cache hit-rate summary"""
+    return {
+        "session": cost_tracker.get_session_summary(),
+        "today": cost_tracker.get_daily_summary(),
+    }
+
+
 @router.get("/chat/test")
 async def test_openai_connection():
     """Test endpoint to verify OpenAI connection"""
@@ -114,13 +403,9 @@ async def test_openai_connection():
 
 
 @router.get("/chat/test-live")
-async def test_live_connection():
+async def test_live_connection(client: OpenAIClient = Depends(get_openai_client)):
     """Actually test the OpenAI API"""
     try:
-        from app.services.openai_client import OpenAIClient
-
-        client = OpenAIClient()
-
         response = await client.chat_completion(
             messages=[{"role": "user", "content": "Say hello!"}], max_tokens=5
         )
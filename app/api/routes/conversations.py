@@ -1,48 +1,65 @@
-﻿from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+﻿from datetime import datetime
 
-from app.db.session import get_db
-from app.schemas.conversation_schema import ConversationCreate, ConversationResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.etag import etag_response
+from app.api.pagination import decode_cursor, encode_cursor
+from app.db import crud
+from app.db.session import get_db, get_read_db
+from app.schemas.conversation_schema import (
+    ConversationCreate,
+    ConversationList,
+    ConversationResponse,
+)
 
 router = APIRouter()
 
 
-@router.get("/conversations", response_model=list[ConversationResponse])
-async def get_conversations(db: Session = Depends(get_db)):
-    """Get all conversations - returns empty list for now"""
-    # TODO: Implement actual database query
-    # For now, return an empty list to match the expected response model
-    return []
+@router.get("/conversations", response_model=ConversationList)
+async def get_conversations(
+    request: Request,
+    user_id: int,
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """A user's conversations, most recently active first"""
+    before = decode_cursor(cursor, datetime, int) if cursor else None
+
+    # One row past the page tells whether there is a next one
+    rows = await crud.get_user_conversations(db, user_id, limit + 1, before)
+    page = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(page[-1].last_message_at, page[-1].id)
+
+    return etag_response(
+        request, ConversationList(conversations=page, next_cursor=next_cursor)
+    )
 
 
 @router.post("/conversations", response_model=ConversationResponse)
 async def create_conversation(
-    conversation: ConversationCreate, db: Session = Depends(get_db)
+    conversation: ConversationCreate, db: AsyncSession = Depends(get_db)
 ):
     """Create a new conversation"""
-    # TODO: Implement actual database creation
-    # For now, return a mock response that matches the schema
-    from datetime import datetime
-
-    return ConversationResponse(
-        id=1,  # Mock ID
-        title=conversation.title or "New Conversation",
-        user_id=conversation.user_id,
-        created_at=datetime.utcnow(),
-        message_count=0,
+    if await crud.get_user(db, conversation.user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return await crud.create_conversation(
+        db, conversation.user_id, conversation.title or "New Conversation"
     )
 
 
 @router.get("/conversations/{conversation_id}", response_model=ConversationResponse)
-async def get_conversation(conversation_id: int, db: Session = Depends(get_db)):
+async def get_conversation(
+    request: Request, conversation_id: int, db: AsyncSession = Depends(get_read_db)
+):
     """Get a specific conversation"""
-    from datetime import datetime
-
-    # TODO: Implement actual database query
-    return ConversationResponse(
-        id=conversation_id,
-        title=f"Conversation {conversation_id}",
-        user_id=1,  # Mock user ID
-        created_at=datetime.utcnow(),
-        message_count=0,
-    )
+    conversation = await crud.get_conversation(db, conversation_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    return etag_response(request, ConversationResponse.model_validate(conversation))
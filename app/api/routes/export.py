@@ -0,0 +1,105 @@
+import json
+import logging
+import zlib
+from collections.abc import AsyncIterator
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db import crud
+from app.db.session import ReadSessionLocal, get_read_db
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _isoformat(value) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def _ndjson_lines(rows, last_conversation_id: int | None) -> list[str]:
+    """NDJSON for a batch of export rows, opening each new conversation"""
+    lines = []
+    for row in rows:
+        if row["conversation_id"] != last_conversation_id:
+            last_conversation_id = row["conversation_id"]
+            conversation = {
+                "type": "conversation",
+                "id": row["conversation_id"],
+                "user_id": row["user_id"],
+                "title": row["title"],
+                "created_at": _isoformat(row["conversation_created_at"]),
+            }
+            lines.append(json.dumps(conversation) + "\n")
+
+        if row["message_id"] is not None:
+            message = {
+                "type": "message",
+                "id": row["message_id"],
+                "conversation_id": row["conversation_id"],
+                "role": row["role"],
+                "content": row["content"],
+                "model": row["model"],
+                "created_at": _isoformat(row["created_at"]),
+            }
+            lines.append(json.dumps(message) + "\n")
+
+    return lines
+
+
+async def _export_stream(user_id: int, compress: bool) -> AsyncIterator[bytes]:
+    """Encode the export one database batch at a time"""
+    compressor = zlib.compressobj(wbits=31) if compress else None  # gzip framing
+    last_conversation_id = None
+    rows = 0
+
+    # Own session: the request's one is closed once the response starts
+    async with ReadSessionLocal() as db:
+        async for batch in crud.stream_export_rows(
+            db, user_id, settings.export_batch_size
+        ):
+            chunk = "".join(_ndjson_lines(batch, last_conversation_id)).encode()
+            last_conversation_id = batch[-1]["conversation_id"]
+            rows += len(batch)
+
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+
+    if compressor is not None:
+        yield compressor.flush()
+
+    logger.info(f"Exported {rows} rows for user {user_id}")
+
+
+@router.get("/export")
+async def export(
+    user_id: int,
+    export_format: Literal["ndjson", "gzip"] = Query(default="ndjson", alias="format"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Download conversations and messages as NDJSON, optionally gzipped
+
+    One `conversation` line is followed by its `message` lines, oldest
+    first.
+    """
+    if await crud.get_user(db, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    filename = f"export-{user_id}.ndjson"
+    media_type = "application/x-ndjson"
+    if export_format == "gzip":
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        _export_stream(user_id, compress=export_format == "gzip"),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
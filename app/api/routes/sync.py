@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.etag import etag_response
+from app.api.pagination import decode_cursor, encode_cursor
+from app.db import crud
+from app.db.session import get_read_db
+from app.schemas.sync_schema import SyncResponse
+
+router = APIRouter()
+
+
+@router.get("/sync", response_model=SyncResponse)
+async def sync(
+    request: Request,
+    user_id: int,
+    cursor: str | None = None,
+    limit: int = Query(default=200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Conversations and messages changed since the cursor
+
+    Start without a cursor for a full sync, then pass back next_cursor.
+    Keep calling while has_more is true; after that, next_cursor is the
+    watermark to resume from on the next reconnect.
+    """
+    # Separate (sync_seq, id) watermarks for conversations and messages.
+    # sync_seq is assigned in commit order, so a write still in flight can
+    # only commit above every watermark handed out
+    keys = decode_cursor(cursor, int, int, int, int) if cursor else (None,) * 4
+    conversations_since = keys[:2] if keys[0] is not None else None
+    messages_since = keys[2:] if keys[2] is not None else None
+
+    conversations = await crud.get_changed_conversations(
+        db, user_id, conversations_since, limit
+    )
+    messages = await crud.get_changed_messages(db, user_id, messages_since, limit)
+
+    if conversations:
+        conversations_since = (conversations[-1].sync_seq, conversations[-1].id)
+    if messages:
+        messages_since = (messages[-1].sync_seq, messages[-1].id)
+
+    next_cursor = encode_cursor(
+        *(conversations_since or (None, None)), *(messages_since or (None, None))
+    )
+
+    return etag_response(
+        request,
+        SyncResponse(
+            conversations=conversations,
+            messages=messages,
+            next_cursor=next_cursor,
+            has_more=len(conversations) == limit or len(messages) == limit,
+        ),
+    )
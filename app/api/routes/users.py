@@ -1,46 +1,52 @@
-﻿from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+﻿from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
-from app.schemas.user_schema import UserCreate, UserResponse
+from app.api.etag import etag_response
+from app.api.pagination import decode_cursor, encode_cursor
+from app.db import crud
+from app.db.session import get_db, get_read_db
+from app.schemas.user_schema import UserCreate, UserList, UserResponse
 
 router = APIRouter()
 
 
-@router.get("/users", response_model=list[UserResponse])
-async def get_users(db: Session = Depends(get_db)):
-    """Get all users - returns empty list for now"""
-    # TODO: Implement actual database query
-    return []
+@router.get("/users", response_model=UserList)
+async def get_users(
+    request: Request,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """List users in id order"""
+    (after_id,) = decode_cursor(cursor, int) if cursor else (None,)
+
+    rows = await crud.get_users(db, limit + 1, after_id)
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1].id) if len(rows) > limit else None
+
+    return etag_response(request, UserList(users=page, next_cursor=next_cursor))
 
 
 @router.post("/users", response_model=UserResponse)
-async def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """Create a new user"""
-    from datetime import datetime
-
-    # TODO: Implement actual database creation and password hashing
-    return UserResponse(
-        id=1,  # Mock ID
-        email=user.email,
-        username=user.username,
-        is_active=True,
-        created_at=datetime.utcnow(),
-        conversation_count=0,
-    )
+    # TODO: Implement password hashing
+    try:
+        return await crud.create_user(db, user)
+    except IntegrityError as e:
+        raise HTTPException(
+            status_code=409, detail="Email or username already registered"
+        ) from e
 
 
 @router.get("/users/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(
+    request: Request, user_id: int, db: AsyncSession = Depends(get_read_db)
+):
     """Get a specific user"""
-    from datetime import datetime
-
-    # TODO: Implement actual database query
-    return UserResponse(
-        id=user_id,
-        email=f"user{user_id}@example.com",
-        username=f"user{user_id}",
-        is_active=True,
-        created_at=datetime.utcnow(),
-        conversation_count=0,
-    )
+    user = await crud.get_user(db, user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return etag_response(request, UserResponse.model_validate(user))
@@ -8,9 +8,111 @@ class Settings(BaseSettings):
 
     # Database
     database_url: str = "sqlite:///./parenting_app.db"
+    # Connection pool (not used for in-memory SQLite); pre-ping and recycle
+    # replace connections the server or a proxy has dropped
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # SQLite files: WAL journal, one writer connection and a pool of
+    # read-only ones. Off means SQLite defaults (rollback journal)
+    sqlite_production_mode: bool = False
+    sqlite_busy_timeout_ms: int = 5000
+    # Page cache budget for all connections of a worker, split between them
+    sqlite_cache_size_kib: int = 32 * 1024
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_journal_size_limit: int = 64 * 1024 * 1024
+    sqlite_checkpoint_interval_seconds: float = 60.0
 
     # OpenAI
     openai_api_key: str = ""
+    openai_timeout: float = 60.0
+    openai_http2: bool = True
+    openai_max_connections: int = 100
+    openai_max_keepalive_connections: int = 20
+    openai_keepalive_expiry: float = 30.0
+
+    # Embeddings and retrieval (queries and documents must use the same
+    # model and dimensions; fewer dimensions make search faster)
+    embedding_model: str = "text-embedding-3-small"
+    embedding_dimensions: int | None = None
+    vector_store_path: str = "./data/vector_store"
+    # On-disk vector format: "float32", "float16" or "int8" (per-row scale).
+    # float32 is fastest to search; int8 is a quarter of the size at about
+    # twice the latency, and float16 is half the size but slowest to score
+    vector_store_dtype: str = "float32"
+    retrieval_top_k: int = 5
+
+    # Hybrid retrieval: BM25 and vector rankings fused by reciprocal rank;
+    # a query whose embedding takes longer than the timeout is served
+    # lexically
+    retrieval_hybrid_enabled: bool = True
+    retrieval_hybrid_candidates: int = 50
+    retrieval_rrf_k: int = 60
+    retrieval_embedding_timeout: float = 1.0
+
+    # Embedding batching and persistent cache (empty path disables the cache)
+    embedding_batch_max_size: int = 256
+    embedding_batch_wait_ms: float = 5.0
+    embedding_cache_path: str = "./data/embedding_cache.sqlite3"
+    # Oldest embeddings are evicted past this many (about 6 KiB each at 1536-d)
+    embedding_cache_max_rows: int = 20_000
+
+    # Approximate index ("exact" or "ivfpq"); nprobe trades recall for latency
+    retrieval_index_mode: str = "exact"
+    ann_n_lists: int = 1024
+    ann_n_subvectors: int = 32
+    ann_nprobe: int = 16
+    ann_rerank_size: int = 64
+
+    # Prompt assembly: input token budget, the share of it retrieved documents
+    # may use (history fills the rest), and the token count cache size
+    prompt_token_budget: int = 3000
+    prompt_context_share: float = 0.6
+    token_count_cache_size: int = 50_000
+
+    # Write-behind message persistence: queued messages are inserted in one
+    # batch every message_write_interval_ms, or at message_write_batch_size
+    message_write_batch_size: int = 200
+    message_write_interval_ms: float = 5.0
+
+    # Rows fetched from the database per batch when streaming an export
+    export_batch_size: int = 500
+
+    # Most recent messages loaded as chat history
+    chat_history_messages: int = 20
+
+    # Per-process cache of recent history; a conversation served by several
+    # workers can see history up to the TTL stale on any one of them
+    history_cache_max_bytes: int = 64 * 1024 * 1024
+    history_cache_ttl_seconds: float = 600.0
+
+    # Rolling conversation summaries: messages older than the last
+    # summary_history_window are folded into the summary, summary_fold_batch
+    # or more at a time, in the background
+    summary_enabled: bool = True
+    summary_history_window: int = 8
+    summary_fold_batch: int = 6
+    summary_max_tokens: int = 300
+
+    # Moderation cache
+    moderation_cache_size: int = 10_000
+    moderation_cache_ttl_seconds: float = 3600.0
+
+    # Moderation batching (max_size 1 disables batching)
+    moderation_batch_max_size: int = 32
+    moderation_batch_wait_ms: float = 5.0
+
+    # Semantic response cache
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = 0.92
+    semantic_cache_max_entries: int = 2048
+    semantic_cache_ttl_seconds: float = 86400.0
+
+    # Idempotency-Key result store for POST /chat
+    idempotency_max_entries: int = 10_000
+    idempotency_ttl_seconds: float = 86400.0
 
     # Security
     secret_key: str = "your-secret-key-change-in-production"
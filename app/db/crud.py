@@ -1,4 +1,8 @@
-﻿from sqlalchemy.ext.asyncio import AsyncSession
+﻿from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import bindparam, insert, or_, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from app.db import models
@@ -8,7 +12,7 @@ from app.schemas import user_schema
 
 
 async def create_user(db: AsyncSession, user: user_schema.UserCreate):
-    new_user = models.User(email=user.email)
+    new_user = models.User(email=user.email, username=user.username)
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
@@ -20,36 +24,287 @@ async def get_user_by_email(db: AsyncSession, email: str):
     return result.scalars().first()
 
 
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(models.User, user_id)
+
+
+async def get_users(db: AsyncSession, limit: int = 50, after_id: int | None = None):
+    """Users in id order, keyset-paginated by the last id seen"""
+    query = select(models.User)
+    if after_id is not None:
+        query = query.where(models.User.id > after_id)
+
+    result = await db.execute(query.order_by(models.User.id).limit(limit))
+    return result.scalars().all()
+
+
 # --- Conversation CRUD operations --- #
 
 
 async def create_conversation(db: AsyncSession, user_id: str, title: str | None = None):
-    new_conversation = models.Conversation(user_id=user_id, title=title)
+    sync_seq = await next_sync_seq(db)
+    now = datetime.utcnow()
+    new_conversation = models.Conversation(
+        user_id=user_id,
+        title=title,
+        created_at=now,
+        last_message_at=now,
+        updated_at=now,
+        sync_seq=sync_seq,
+    )
     db.add(new_conversation)
+    await db.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(conversation_count=models.User.conversation_count + 1)
+    )
     await db.commit()
     await db.refresh(new_conversation)
     return new_conversation
 
 
-async def get_conversation_messages(db: AsyncSession, conversation_id: str):
+async def get_user_conversations(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 20,
+    before: tuple[datetime, int] | None = None,
+):
+    """
+    A user's conversations, most recently active first, from one query on
+    the (user_id, last_message_at, id) index. Pass the last conversation of
+    a page as the cursor for the next one.
+    """
+    conversation = models.Conversation
+    query = select(conversation).where(conversation.user_id == user_id)
+    if before is not None:
+        query = query.where(
+            tuple_(conversation.last_message_at, conversation.id) < tuple_(*before)
+        )
+
     result = await db.execute(
-        select(models.Message)
-        .where(models.Message.conversation_id == conversation_id)
-        .order_by(models.Message.created_at)
+        query.order_by(
+            conversation.last_message_at.desc(), conversation.id.desc()
+        ).limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def get_conversation_messages(
+    db: AsyncSession,
+    conversation_id: int,
+    limit: int = 50,
+    before_id: int | None = None,
+    after_id: int | None = None,
+):
+    """
+    The newest `limit` messages before a message id, oldest first.
+
+    Messages are ordered by id, the order they were written in, like the
+    summarizer's fold boundary: write-behind can store a message after one
+    that arrived later. Keyset pagination walks the (conversation_id, id)
+    index, so a page costs the same however long the conversation is. Pass
+    the first message of a page as the cursor for the page before it.
+    """
+    message = models.Message
+    query = select(message).where(message.conversation_id == conversation_id)
+    if before_id is not None:
+        query = query.where(message.id < before_id)
+    if after_id is not None:
+        query = query.where(message.id > after_id)
+
+    result = await db.execute(query.order_by(message.id.desc()).limit(limit))
+    return list(reversed(result.scalars().all()))
+
+
+async def get_conversation(db: AsyncSession, conversation_id: int):
+    return await db.get(models.Conversation, conversation_id)
+
+
+async def get_messages_after(
+    db: AsyncSession, conversation_id: int, after_id: int | None, limit: int
+):
+    """The oldest `limit` messages after after_id, oldest first"""
+    query = select(models.Message).where(
+        models.Message.conversation_id == conversation_id
     )
+    if after_id is not None:
+        query = query.where(models.Message.id > after_id)
+
+    result = await db.execute(query.order_by(models.Message.id).limit(limit))
     return result.scalars().all()
 
 
+async def update_conversation_summary(
+    db: AsyncSession, conversation_id: int, summary: str, summarized_message_id: int
+):
+    """Store a folded summary unless a concurrent fold got further"""
+    conversation = models.Conversation
+    result = await db.execute(
+        update(conversation)
+        .where(
+            conversation.id == conversation_id,
+            or_(
+                conversation.summarized_message_id.is_(None),
+                conversation.summarized_message_id < summarized_message_id,
+            ),
+        )
+        .values(
+            summary=summary,
+            summarized_message_id=summarized_message_id,
+            # Summaries are server-side only; don't make clients re-sync.
+            # sync_seq has no onupdate, so it is left as it is
+            updated_at=conversation.updated_at,
+        )
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+
+async def next_sync_seq(db: AsyncSession) -> int:
+    """
+    Bump the sync counter in this transaction; call it before any other
+    write so the counter's lock orders the whole transaction
+    """
+    counter = models.SyncCounter.__table__
+    result = await db.execute(
+        update(counter)
+        .where(counter.c.id == 1)
+        .values(value=counter.c.value + 1)
+        .returning(counter.c.value)
+    )
+    return result.scalar_one()
+
+
+async def get_changed_conversations(
+    db: AsyncSession,
+    user_id: int,
+    since: tuple[int, int] | None,
+    limit: int,
+):
+    """A user's conversations changed after a (sync_seq, id) watermark"""
+    conversation = models.Conversation
+    query = select(conversation).where(conversation.user_id == user_id)
+    if since is not None:
+        query = query.where(
+            tuple_(conversation.sync_seq, conversation.id) > tuple_(*since)
+        )
+
+    result = await db.execute(
+        query.order_by(conversation.sync_seq, conversation.id).limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def get_changed_messages(
+    db: AsyncSession,
+    user_id: int,
+    since: tuple[int, int] | None,
+    limit: int,
+):
+    """Messages in a user's conversations changed after a watermark"""
+    message = models.Message
+    user_conversations = select(models.Conversation.id).where(
+        models.Conversation.user_id == user_id
+    )
+    query = select(message).where(message.conversation_id.in_(user_conversations))
+    if since is not None:
+        query = query.where(tuple_(message.sync_seq, message.id) > tuple_(*since))
+
+    result = await db.execute(query.order_by(message.sync_seq, message.id).limit(limit))
+    return result.scalars().all()
+
+
+async def stream_export_rows(db: AsyncSession, user_id: int, batch_size: int = 500):
+    """
+    A user's conversations with their messages, in order, as batches of
+    plain rows read from a server-side cursor
+    """
+    conversation = models.Conversation
+    message = models.Message
+    query = (
+        select(
+            conversation.id.label("conversation_id"),
+            conversation.user_id,
+            conversation.title,
+            conversation.created_at.label("conversation_created_at"),
+            message.id.label("message_id"),
+            message.role,
+            message.content,
+            message.model,
+            message.created_at,
+        )
+        .outerjoin(message, message.conversation_id == conversation.id)
+        .where(conversation.user_id == user_id)
+        .order_by(conversation.id, message.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await db.stream(query)
+    async for batch in result.mappings().partitions():
+        yield batch
+
+
 # --- Message CRUD operations --- #
 
 
 async def create_message(
-    db: AsyncSession, conversation_id: str, content: str, sender_role: str
+    db: AsyncSession, conversation_id: str, content: str, role: str
 ):
+    sync_seq = await next_sync_seq(db)
     new_message = models.Message(
-        conversation_id=conversation_id, content=content, sender_role=sender_role
+        conversation_id=conversation_id,
+        content=content,
+        role=role,
+        created_at=datetime.utcnow(),
+        sync_seq=sync_seq,
     )
     db.add(new_message)
+    await _count_messages(
+        db,
+        [{"conversation_id": conversation_id, "created_at": new_message.created_at}],
+        sync_seq,
+    )
     await db.commit()
     await db.refresh(new_message)
     return new_message
+
+
+async def create_messages(db: AsyncSession, rows: list[dict]):
+    """Insert many messages with one executemany and one commit"""
+    sync_seq = await next_sync_seq(db)
+    await db.execute(
+        insert(models.Message), [{**row, "sync_seq": sync_seq} for row in rows]
+    )
+    await _count_messages(db, rows, sync_seq)
+    await db.commit()
+
+
+async def _count_messages(db: AsyncSession, rows: list[dict], sync_seq: int):
+    """Bump the conversations' message counters, one executemany for all"""
+    now = datetime.utcnow()
+    counts = Counter(row["conversation_id"] for row in rows)
+    latest: dict[int, datetime] = {}
+    for row in rows:
+        created_at = row.get("created_at") or now
+        conversation_id = row["conversation_id"]
+        latest[conversation_id] = max(
+            latest.get(conversation_id, created_at), created_at
+        )
+
+    conversations = models.Conversation.__table__
+    await db.execute(
+        update(conversations)
+        .where(conversations.c.id == bindparam("b_id"))
+        .values(
+            message_count=conversations.c.message_count + bindparam("b_count"),
+            last_message_at=bindparam("b_last"),
+            sync_seq=sync_seq,
+        ),
+        [
+            {
+                "b_id": conversation_id,
+                "b_count": count,
+                "b_last": latest[conversation_id],
+            }
+            for conversation_id, count in counts.items()
+        ],
+    )
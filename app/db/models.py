@@ -1,6 +1,17 @@
 ﻿from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    event,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -15,6 +26,31 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Denormalized, maintained by crud when conversations are created
+    conversation_count = Column(Integer, default=0, nullable=False)
+
+
+class SyncCounter(Base):
+    """
+    Source of the sync_seq change watermark
+    A single row, bumped first in every transaction that changes synced
+    rows. Its row lock (SQLite's write lock) is held until commit, so a
+    higher value always belongs to a later commit, however long a write
+    waited before committing
+    """
+
+    __tablename__ = "sync_counter"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+event.listen(
+    SyncCounter.__table__,
+    "after_create",
+    DDL("INSERT INTO sync_counter (id, value) VALUES (1, 0)"),
+)
+
 
 class Conversation(Base):
     __tablename__ = "conversations"
@@ -24,8 +60,28 @@ class Conversation(Base):
     title = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Denormalized, maintained by crud when messages are written; a new
+    # conversation's last_message_at is its creation time
+    message_count = Column(Integer, default=0, nullable=False)
+    last_message_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Change watermark for delta sync, from SyncCounter
+    sync_seq = Column(BigInteger, nullable=False, default=0)
+
+    # Rolling summary of every message up to and including
+    # summarized_message_id; later messages are sent verbatim
+    summary = Column(Text)
+    summarized_message_id = Column(Integer)
+
     user = relationship("User")
 
+    # Serve a user's conversation list, most recently active first, and
+    # their conversations changed since a sync watermark
+    __table_args__ = (
+        Index("ix_conversations_user_last_message", "user_id", "last_message_at", "id"),
+        Index("ix_conversations_user_sync", "user_id", "sync_seq", "id"),
+    )
+
 
 class Message(Base):
     __tablename__ = "messages"
@@ -34,6 +90,20 @@ class Message(Base):
     conversation_id = Column(Integer, ForeignKey("conversations.id"))
     content = Column(Text)
     role = Column(String)  # user, assistant
+    # Usage of the completion that produced an assistant message
+    model = Column(String)
+    input_tokens = Column(Integer)
+    output_tokens = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Change watermark for delta sync, from SyncCounter
+    sync_seq = Column(BigInteger, nullable=False, default=0)
 
     conversation = relationship("Conversation")
+
+    # Serve keyset pagination of a conversation's messages, newest first, and
+    # its messages changed since a sync watermark
+    __table_args__ = (
+        Index("ix_messages_conversation_id", "conversation_id", "id"),
+        Index("ix_messages_conversation_sync", "conversation_id", "sync_seq", "id"),
+    )
@@ -1,43 +1,193 @@
-﻿import logging
+﻿import asyncio
+import logging
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Async drivers for the sync URLs in DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url: str | URL) -> URL:
+    """The same database addressed through its async driver"""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def _is_memory_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (
+        None,
+        "",
+        ":memory:",
+    )
+
+
+def _create_engine(url: URL, **pool_overrides) -> AsyncEngine:
+    """Async engine with the configured connection pool"""
+    if _is_memory_sqlite(url):
+        # Every pooled connection would see its own empty in-memory database
+        pool_options = {"poolclass": StaticPool}
+    else:
+        pool_options = {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout": settings.db_pool_timeout,
+            "pool_recycle": settings.db_pool_recycle,
+            "pool_pre_ping": settings.db_pool_pre_ping,
+            **pool_overrides,
+        }
+
+    return create_async_engine(
+        url,
+        echo=settings.debug,  # Log SQL queries in debug mode
+        **pool_options,
+    )
+
+
+def _sqlite_pragmas(cache_size_kib: int, read_only: bool = False) -> list[str]:
+    """Per-connection settings for production SQLite"""
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        # Durable at checkpoints rather than every commit; still never corrupt
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA cache_size=-{cache_size_kib}",  # negative: KiB
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        f"PRAGMA journal_size_limit={settings.sqlite_journal_size_limit}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def _run_on_connect(engine: AsyncEngine, statements: list[str]):
+    """Run statements on every new DBAPI connection of an engine"""
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+
+
+def create_engines(
+    url: URL, sqlite_production: bool | None = None
+) -> tuple[AsyncEngine, AsyncEngine]:
+    """
+    Engines for writing and for reading, the same one unless the database
+    is a SQLite file in production mode
+    """
+    if sqlite_production is None:
+        sqlite_production = settings.sqlite_production_mode
+    if (
+        not sqlite_production
+        or url.get_backend_name() != "sqlite"
+        or _is_memory_sqlite(url)
+    ):
+        engine = _create_engine(url)
+        return engine, engine
+
+    # SQLite allows one writer at a time: a single pooled connection queues
+    # writers in the pool instead of in lock retries, while WAL lets the
+    # read-only connections run alongside it
+    writer = _create_engine(url, pool_size=1, max_overflow=0)
+    reader = _create_engine(url)
+
+    connections = 1 + settings.db_pool_size + settings.db_max_overflow
+    cache_size_kib = max(settings.sqlite_cache_size_kib // connections, 512)
+    _run_on_connect(writer, _sqlite_pragmas(cache_size_kib))
+    _run_on_connect(reader, _sqlite_pragmas(cache_size_kib, read_only=True))
+    return writer, reader
+
+
 # Create engine with error handling
 try:
     if not settings.database_url:
         raise ValueError("DATABASE_URL not configured")
 
-    engine = create_engine(
-        settings.database_url,
-        echo=settings.debug,  # Log SQL queries in debug mode
-        connect_args=(
-            {"check_same_thread": False} if "sqlite" in settings.database_url else {}
-        ),
-    )
-
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine, read_engine = create_engines(async_database_url(settings.database_url))
     logger.info(f"Database connected: {settings.database_url}")
 
 except Exception as e:
     logger.error(f"Database connection failed: {str(e)}")
     # For development, we'll create a fallback in-memory SQLite database
     logger.warning("Using fallback in-memory SQLite database")
-    engine = create_engine(
-        "sqlite:///:memory:",
-        echo=settings.debug,
-        connect_args={"check_same_thread": False},
-    )
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine = read_engine = _create_engine(make_url("sqlite+aiosqlite:///:memory:"))
+
+# Separate engines only for production SQLite, which runs in WAL mode
+wal_enabled = read_engine is not engine
+
+# expire_on_commit=False: attribute access after commit would need I/O,
+# which AsyncSession cannot do implicitly
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+# Sessions for read-only work; writing through them fails on production SQLite
+ReadSessionLocal = async_sessionmaker(
+    read_engine, autoflush=False, expire_on_commit=False
+)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def get_read_db():
+    async with ReadSessionLocal() as db:
+        yield db
+
+
+async def wal_checkpoint(mode: str = "PASSIVE"):
+    """Copy committed pages from the write-ahead log into the database file"""
+    async with engine.connect() as conn:
+        result = await conn.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})")
+        busy, wal_pages, checkpointed = result.one()
+
+    logger.debug(
+        f"WAL checkpoint ({mode}): {checkpointed}/{wal_pages} pages"
+        f"{' (busy)' if busy else ''}"
+    )
+
+
+async def _checkpoint_periodically(interval_seconds: float):
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await wal_checkpoint()
+        except Exception as e:
+            logger.error(f"WAL checkpoint failed: {e}")
+
+
+def start_wal_checkpoints() -> asyncio.Task | None:
+    """
+    Checkpoint every sqlite_checkpoint_interval_seconds, so the log is
+    caught up in quiet periods rather than only when commits trigger it
+    """
+    if not wal_enabled:
+        return None
+    return asyncio.create_task(
+        _checkpoint_periodically(settings.sqlite_checkpoint_interval_seconds)
+    )
+
+
+async def close_engines():
+    """Fold the write-ahead log into the database and close all connections"""
+    if wal_enabled:
+        try:
+            await wal_checkpoint("TRUNCATE")
+        except Exception as e:
+            logger.error(f"Final WAL checkpoint failed: {e}")
+        await read_engine.dispose()
+
+    await engine.dispose()
@@ -1,10 +1,13 @@
 ﻿import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.routes import conversations, health, users
+from app.api.routes import conversations, export, health, sync, users
 from app.core.config import settings
+from app.db.session import close_engines, start_wal_checkpoints
+from app.services.client_registry import ClientRegistry
 
 # Setup basic logging
 logging.basicConfig(
@@ -14,10 +17,27 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared clients on startup and close them on shutdown"""
+    app.state.clients = ClientRegistry()
+    await app.state.clients.start()
+    checkpoints = start_wal_checkpoints()
+
+    yield
+
+    await app.state.clients.close()
+    if checkpoints is not None:
+        checkpoints.cancel()
+    await close_engines()
+
+
 app = FastAPI(
     title="Parenting App API",
     description="AI-powered parenting advice platform",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -33,6 +53,8 @@ app.add_middleware(
 app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(conversations.router, prefix="/api/v1", tags=["conversations"])
 app.include_router(users.router, prefix="/api/v1", tags=["users"])
+app.include_router(sync.router, prefix="/api/v1", tags=["sync"])
+app.include_router(export.router, prefix="/api/v1", tags=["export"])
 
 # Only include chat router if everything is properly configured
 try:
@@ -23,12 +23,18 @@ class ConversationResponse(ConversationBase):
     user_id: int
     created_at: datetime
     updated_at: datetime | None = None
+    last_message_at: datetime | None = None
     message_count: int | None = 0
 
     class Config:
         from_attributes = True
 
 
+class ConversationList(BaseModel):
+    conversations: list[ConversationResponse]
+    next_cursor: str | None = None
+
+
 class ConversationWithMessages(ConversationResponse):
     messages: list[MessageInDB] = []
 
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from app.schemas.conversation_schema import ConversationResponse
+from app.schemas.message_schema import MessageBase
+
+
+class SyncMessage(MessageBase):
+    id: int
+    conversation_id: int
+    created_at: datetime
+    updated_at: datetime | None = None
+    model: str | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class SyncResponse(BaseModel):
+    conversations: list[ConversationResponse]
+    messages: list[SyncMessage]
+    next_cursor: str
+    has_more: bool = False
@@ -29,6 +29,11 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
+class UserList(BaseModel):
+    users: list[UserResponse]
+    next_cursor: str | None = None
+
+
 class UserInDB(UserBase):
     id: int
     hashed_password: str
@@ -0,0 +1,258 @@
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rows per block when scoring large matrices, to bound temporary memory
+BLOCK_ROWS = 65_536
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 15, seed: int = 0) -> np.ndarray:
+    """Plain Lloyd's k-means; returns (k, dim) float32 centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _nearest(data, centroids)
+
+        counts = np.bincount(assignments, minlength=k)
+        empty = counts == 0
+
+        # Sum each cluster's points with one sort + reduceat
+        order = np.argsort(assignments, kind="stable")
+        starts = (np.cumsum(counts) - counts)[~empty]
+        sums = np.add.reduceat(data[order], starts, axis=0)
+
+        centroids[~empty] = sums / counts[~empty, None]
+        # Re-seed empty clusters from random points
+        centroids[empty] = data[rng.choice(len(data), size=int(empty.sum()))]
+
+    return centroids.astype(np.float32)
+
+
+def _nearest(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the L2-nearest centroid for every row, computed in blocks"""
+    centroid_norms = (centroids**2).sum(axis=1)
+    out = np.empty(len(data), dtype=np.int64)
+
+    for start in range(0, len(data), BLOCK_ROWS):
+        block = data[start : start + BLOCK_ROWS]
+        # ||x - c||^2 = ||x||^2 - 2 x.c + ||c||^2; ||x||^2 doesn't change argmin
+        distances = centroid_norms - 2.0 * (block @ centroids.T)
+        out[start : start + len(block)] = np.argmin(distances, axis=1)
+
+    return out
+
+
+class IVFPQIndex:
+    """
+    Approximate nearest-neighbour index (IVF with product quantization)
+    Vectors are assigned to the nearest of n_lists coarse centroids and their
+    residuals are compressed to one byte per subvector. A search scans only
+    the nprobe closest lists using lookup tables, then optionally re-ranks
+    the best candidates against the exact vectors.
+    """
+
+    PQ_CENTROIDS = 256  # One byte per subvector code
+
+    def __init__(self, n_lists: int = 1024, n_subvectors: int = 32, nprobe: int = 8):
+        self.n_lists = n_lists
+        self.n_subvectors = n_subvectors
+        self.nprobe = nprobe
+
+        self.coarse_centroids: np.ndarray | None = None  # (n_lists, dim)
+        self.pq_codebooks: np.ndarray | None = None  # (m, 256, dim / m)
+
+        # Inverted lists in CSR form, rows sorted by list
+        self.list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.codes = np.zeros((0, n_subvectors), dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        n_lists: int = 1024,
+        n_subvectors: int = 32,
+        nprobe: int = 8,
+        train_size: int = 100_000,
+    ) -> "IVFPQIndex":
+        """Train on a sample of the (normalized) vectors and index them all"""
+        dim = vectors.shape[1]
+
+        # Fall back to the largest subvector count that divides dim
+        while dim % n_subvectors:
+            n_subvectors -= 1
+
+        # ~39 points per list is the minimum for stable centroids
+        n_lists = max(1, min(n_lists, len(vectors) // 39))
+
+        index = cls(n_lists=n_lists, n_subvectors=n_subvectors, nprobe=nprobe)
+        index.train(vectors, train_size=train_size)
+        index.add(vectors)
+        return index
+
+    def train(self, vectors: np.ndarray, train_size: int = 100_000):
+        """Learn coarse centroids and residual PQ codebooks"""
+        start = time.perf_counter()
+        rng = np.random.default_rng(0)
+
+        sample_size = min(len(vectors), max(train_size, 39 * self.n_lists))
+        sample = np.asarray(
+            vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))],
+            dtype=np.float32,
+        )
+
+        self.coarse_centroids = kmeans(sample, self.n_lists)
+
+        residuals = (
+            sample - self.coarse_centroids[_nearest(sample, self.coarse_centroids)]
+        )
+        dsub = sample.shape[1] // self.n_subvectors
+        pq_k = min(self.PQ_CENTROIDS, len(sample))
+
+        self.pq_codebooks = np.zeros(
+            (self.n_subvectors, self.PQ_CENTROIDS, dsub), dtype=np.float32
+        )
+        for j in range(self.n_subvectors):
+            self.pq_codebooks[j, :pq_k] = kmeans(
+                residuals[:, j * dsub : (j + 1) * dsub], pq_k
+            )
+
+        logger.info(
+            f"Trained IVF-PQ ({self.n_lists} lists, {self.n_subvectors} subvectors) "
+            f"on {sample_size} vectors in {time.perf_counter() - start:.1f}s"
+        )
+
+    def _encode(self, residuals: np.ndarray) -> np.ndarray:
+        """Quantize residuals to one PQ code per subvector"""
+        dsub = residuals.shape[1] // self.n_subvectors
+        codes = np.empty((len(residuals), self.n_subvectors), dtype=np.uint8)
+
+        for j in range(self.n_subvectors):
+            codes[:, j] = _nearest(
+                residuals[:, j * dsub : (j + 1) * dsub], self.pq_codebooks[j]
+            )
+
+        return codes
+
+    def add(self, vectors: np.ndarray, start_id: int = 0):
+        """Index vectors, with ids start_id .. start_id + len(vectors) - 1"""
+        ids = [self.ids]
+        codes = [self.codes]
+        lists = [np.repeat(np.arange(self.n_lists), np.diff(self.list_offsets))]
+
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            block = np.asarray(vectors[start : start + BLOCK_ROWS], dtype=np.float32)
+            assigned = _nearest(block, self.coarse_centroids)
+
+            ids.append(np.arange(len(block), dtype=np.int64) + start_id + start)
+            codes.append(self._encode(block - self.coarse_centroids[assigned]))
+            lists.append(assigned)
+
+        all_lists = np.concatenate(lists)
+        order = np.argsort(all_lists, kind="stable")
+
+        self.ids = np.concatenate(ids)[order]
+        self.codes = np.concatenate(codes)[order]
+        self.list_offsets = np.zeros(self.n_lists + 1, dtype=np.int64)
+        self.list_offsets[1:] = np.cumsum(
+            np.bincount(all_lists, minlength=self.n_lists)
+        )
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int = 5,
+        nprobe: int | None = None,
+        rerank_vectors: np.ndarray | None = None,
+        rerank_size: int = 64,
+    ) -> list[tuple[int, float]]:
+        """
+        Approximate inner-product top-k for a normalized query.
+
+        Larger nprobe scans more lists: higher recall, higher latency. If
+        rerank_vectors is given, the best rerank_size candidates are scored
+        exactly against it before the final top_k is taken.
+        """
+        if len(self.ids) == 0:
+            return []
+
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        query = np.asarray(query, dtype=np.float32)
+
+        coarse_scores = self.coarse_centroids @ query
+        probe = np.argpartition(-coarse_scores, nprobe - 1)[:nprobe]
+
+        # Lookup table: score of every PQ centroid against each query subvector
+        dsub = query.shape[0] // self.n_subvectors
+        lut = np.einsum(
+            "mkd,md->mk",
+            self.pq_codebooks,
+            query.reshape(self.n_subvectors, dsub),
+        )
+
+        starts, ends = self.list_offsets[probe], self.list_offsets[probe + 1]
+        rows = np.concatenate(
+            [np.arange(s, e) for s, e in zip(starts, ends, strict=True)]
+        )
+        if len(rows) == 0:
+            return []
+
+        list_scores = np.repeat(coarse_scores[probe], ends - starts)
+        scores = list_scores + lut[np.arange(self.n_subvectors), self.codes[rows]].sum(
+            axis=1
+        )
+
+        candidates = rerank_size if rerank_vectors is not None else top_k
+        candidates = min(max(candidates, top_k), len(rows))
+        best = np.argpartition(-scores, candidates - 1)[:candidates]
+        ids, scores = self.ids[rows[best]], scores[best]
+
+        if rerank_vectors is not None:
+            order = np.argsort(ids)  # Sorted row access is kinder to mmaps
+            ids = ids[order]
+            scores = np.asarray(rerank_vectors[ids], dtype=np.float32) @ query
+
+        top = np.argsort(-scores)[:top_k]
+        return [(int(i), float(s)) for i, s in zip(ids[top], scores[top], strict=True)]
+
+    def save(self, path: str | Path):
+        """Persist the index as a single .npz file"""
+        np.savez(
+            path,
+            coarse_centroids=self.coarse_centroids,
+            pq_codebooks=self.pq_codebooks,
+            list_offsets=self.list_offsets,
+            ids=self.ids,
+            codes=self.codes,
+            nprobe=self.nprobe,
+        )
+        logger.info(f"Saved IVF-PQ index ({len(self)} vectors) to {path}")
+
+    @classmethod
+    def load(cls, path: str | Path, nprobe: int | None = None) -> "IVFPQIndex":
+        """Load an index written by save()"""
+        with np.load(path) as data:
+            n_lists = len(data["coarse_centroids"])
+            n_subvectors = data["pq_codebooks"].shape[0]
+
+            index = cls(
+                n_lists=n_lists,
+                n_subvectors=n_subvectors,
+                nprobe=nprobe or int(data["nprobe"]),
+            )
+            index.coarse_centroids = data["coarse_centroids"]
+            index.pq_codebooks = data["pq_codebooks"]
+            index.list_offsets = data["list_offsets"]
+            index.ids = data["ids"]
+            index.codes = data["codes"]
+
+        logger.info(f"Loaded IVF-PQ index ({len(index)} vectors) from {path}")
+        return index
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=Hashable)
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Coalesce concurrent single-item calls into batched calls
+    A batch is sent when it reaches max_batch_size items or max_wait_ms after
+    its first item arrives. Identical items in a batch are sent once.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[list[T]], Awaitable[list[R]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        name: str = "batch",
+    ):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.name = name
+
+        self._pending: list[tuple[T, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._in_flight: set[asyncio.Task] = set()
+
+        self.batches_sent = 0
+        self.items_submitted = 0
+
+    async def submit(self, item: T) -> R:
+        """Queue an item and wait for its result from the next batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        self.items_submitted += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Send everything pending as one batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._send(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: list[tuple[T, asyncio.Future]]):
+        """Call the handler once and fan results back out to the callers"""
+        unique = list(dict.fromkeys(item for item, _ in batch))
+        self.batches_sent += 1
+
+        try:
+            results = await self.handler(unique)
+            by_item = dict(zip(unique, results, strict=True))
+
+        except Exception as e:
+            logger.debug(f"{self.name} batch of {len(unique)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for item, future in batch:
+            # Callers may have been cancelled while the batch was in flight
+            if not future.done():
+                future.set_result(by_item[item])
+
+    async def aclose(self):
+        """Send any pending items and wait for in-flight batches"""
+        self._flush()
+        await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+    def get_stats(self) -> dict[str, float]:
+        """Get batching counters"""
+        return {
+            "items_submitted": self.items_submitted,
+            "batches_sent": self.batches_sent,
+            "average_batch_size": round(
+                self.items_submitted / max(self.batches_sent, 1), 2
+            ),
+        }
@@ -0,0 +1,150 @@
+import logging
+
+import httpx
+from openai import DefaultAsyncHttpxClient
+
+from app.core.config import settings
+from app.db.session import ReadSessionLocal, SessionLocal
+from app.services.cost_tracker import CostTracker
+from app.services.embeddings import EmbeddingService
+from app.services.history_cache import HistoryCache
+from app.services.idempotency import IdempotencyStore
+from app.services.langgraph_pipeline import LangGraphPipeline
+from app.services.message_writer import MessageWriter
+from app.services.openai_client import OpenAIClient
+from app.services.retrieval import RetrievalService
+from app.services.summarizer import ConversationSummarizer
+
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    """HTTP/2 support in httpx needs the optional h2 package"""
+    try:
+        import h2  # noqa: F401
+
+        return True
+    except ImportError:
+        return False
+
+
+class ClientRegistry:
+    """
+    Process-wide shared API clients
+    Created once at application startup so every request reuses the same
+    keep-alive connection pool instead of paying for new TLS handshakes
+    """
+
+    def __init__(self):
+        self.http_client: httpx.AsyncClient | None = None
+        self.openai: OpenAIClient | None = None
+        self.embeddings: EmbeddingService | None = None
+        self.pipeline: LangGraphPipeline | None = None
+        self.retrieval: RetrievalService | None = None
+        self.summarizer: ConversationSummarizer | None = None
+        self.message_writer: MessageWriter | None = None
+        self.history_cache: HistoryCache | None = None
+        self.cost_tracker = CostTracker()
+        self.idempotency = IdempotencyStore(
+            max_entries=settings.idempotency_max_entries,
+            ttl_seconds=settings.idempotency_ttl_seconds,
+        )
+        self.cost_tracker.register_cache("idempotency", self.idempotency.get_stats)
+
+    async def start(self):
+        """Create the shared connection pool and clients"""
+        http2 = settings.openai_http2 and _http2_available()
+        if settings.openai_http2 and not http2:
+            logger.warning("h2 package not installed - OpenAI client using HTTP/1.1")
+
+        self.http_client = DefaultAsyncHttpxClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_max_keepalive_connections,
+                keepalive_expiry=settings.openai_keepalive_expiry,
+            ),
+        )
+
+        try:
+            self.openai = OpenAIClient(http_client=self.http_client)
+        except ValueError as e:
+            logger.warning(f"Shared OpenAI client not created: {e}")
+            return
+
+        self.cost_tracker.register_cache(
+            "moderation", self.openai.moderation_cache.get_stats
+        )
+        self.embeddings = EmbeddingService(self.openai, cost_tracker=self.cost_tracker)
+        self.cost_tracker.register_cache("embedding", self.embeddings.get_stats)
+
+        self.retrieval = RetrievalService.from_settings(self.embeddings)
+        self.pipeline = LangGraphPipeline(
+            openai_client=self.openai,
+            cost_tracker=self.cost_tracker,
+            retrieval=self.retrieval,
+            embeddings=self.embeddings,
+        )
+
+        self.history_cache = HistoryCache(
+            max_messages=settings.chat_history_messages,
+            max_bytes=settings.history_cache_max_bytes,
+            ttl_seconds=settings.history_cache_ttl_seconds,
+        )
+        self.cost_tracker.register_cache("history", self.history_cache.get_stats)
+
+        if settings.summary_enabled:
+            self.summarizer = ConversationSummarizer(
+                self.openai,
+                SessionLocal,
+                cost_tracker=self.cost_tracker,
+                history_window=settings.summary_history_window,
+                fold_batch=settings.summary_fold_batch,
+                max_tokens=settings.summary_max_tokens,
+                on_fold=self.history_cache.fold,
+                read_session_factory=ReadSessionLocal,
+            )
+            self.cost_tracker.register_cache("summarizer", self.summarizer.get_stats)
+
+        self.message_writer = MessageWriter(
+            SessionLocal,
+            max_batch_rows=settings.message_write_batch_size,
+            flush_interval_ms=settings.message_write_interval_ms,
+            on_commit=self.summarizer.schedule if self.summarizer else None,
+            # Cached turns that never reached the database must not be served
+            on_drop=self.history_cache.invalidate,
+        )
+        self.message_writer.start()
+        self.cost_tracker.register_cache(
+            "message_writer", self.message_writer.get_stats
+        )
+
+        logger.info(f"Client registry started (http2={http2})")
+
+    async def close(self):
+        """Close the shared connection pool"""
+        # Queued messages are written first; they may schedule summaries
+        if self.message_writer is not None:
+            await self.message_writer.aclose()
+            self.message_writer = None
+
+        if self.summarizer is not None:
+            await self.summarizer.aclose()
+            self.summarizer = None
+
+        if self.embeddings is not None:
+            await self.embeddings.close()
+            self.embeddings = None
+
+        if self.openai is not None:
+            await self.openai.close()
+
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+
+        self.openai = None
+        self.history_cache = None
+        self.pipeline = None
+        self.retrieval = None
+        logger.info("Client registry closed")
@@ -1,4 +1,5 @@
 ﻿import logging
+from collections.abc import Callable
 from datetime import datetime
 from typing import Any
 
@@ -14,6 +15,10 @@ class UsageMetrics(BaseModel):
     total_input_tokens: int = 0
     total_output_tokens: int = 0
     total_cost: float = 0.0
+    cached_calls: int = 0
+    saved_cost: float = 0.0
+    discarded_calls: int = 0
+    discarded_cost: float = 0.0
     last_updated: datetime = datetime.utcnow()
 
 
@@ -27,6 +32,7 @@ class CostTracker:
     PRICING = {
         "gpt-4": {"input": 0.03, "output": 0.06},
         "gpt-4-turbo": {"input": 0.01, "output": 0.03},
+        "gpt-4o-mini": {"input": 0.00015, "output": 0.0006},
         "gpt-3.5-turbo": {"input": 0.001, "output": 0.002},
         "text-embedding-3-small": {"input": 0.00002, "output": 0.0},
         "text-embedding-3-large": {"input": 0.00013, "output": 0.0},
@@ -35,6 +41,7 @@ class CostTracker:
     def __init__(self):
         self.daily_metrics: dict[str, UsageMetrics] = {}
         self.session_metrics = UsageMetrics()
+        self.cache_stats: dict[str, Callable[[], dict[str, Any]]] = {}
 
     async def track_chat_completion(
         self, input_tokens: int, output_tokens: int, model: str
@@ -93,6 +100,54 @@ class CostTracker:
 
         return cost
 
+    async def track_cache_hit(
+        self, input_tokens: int, output_tokens: int, model: str
+    ) -> float:
+        """Track a response served from cache and the cost it avoided"""
+
+        saved = self._calculate_cost(input_tokens, output_tokens, model)
+
+        self.session_metrics.cached_calls += 1
+        self.session_metrics.saved_cost += saved
+
+        today = datetime.utcnow().date().isoformat()
+        if today not in self.daily_metrics:
+            self.daily_metrics[today] = UsageMetrics()
+
+        daily = self.daily_metrics[today]
+        daily.cached_calls += 1
+        daily.saved_cost += saved
+
+        return saved
+
+    async def track_discarded_completion(
+        self, input_tokens: int, output_tokens: int, model: str
+    ) -> float:
+        """Track a billed completion whose response was never delivered"""
+
+        wasted = self._calculate_cost(input_tokens, output_tokens, model)
+
+        self.session_metrics.discarded_calls += 1
+        self.session_metrics.discarded_cost += wasted
+
+        today = datetime.utcnow().date().isoformat()
+        if today not in self.daily_metrics:
+            self.daily_metrics[today] = UsageMetrics()
+
+        daily = self.daily_metrics[today]
+        daily.discarded_calls += 1
+        daily.discarded_cost += wasted
+
+        return wasted
+
+    def register_cache(self, name: str, get_stats: Callable[[], dict[str, Any]]):
+        """Report a cache's hit/miss stats alongside usage summaries"""
+        self.cache_stats[name] = get_stats
+
+    def get_cache_summary(self) -> dict[str, Any]:
+        """Get stats for every registered cache"""
+        return {name: get_stats() for name, get_stats in self.cache_stats.items()}
+
     def _calculate_cost(
         self, input_tokens: int, output_tokens: int, model: str
     ) -> float:
@@ -127,6 +182,10 @@ class CostTracker:
             "average_cost_per_call": round(
                 metrics.total_cost / max(metrics.total_calls, 1), 4
             ),
+            "cached_calls": metrics.cached_calls,
+            "saved_cost": round(metrics.saved_cost, 4),
+            "discarded_calls": metrics.discarded_calls,
+            "discarded_cost": round(metrics.discarded_cost, 4),
         }
 
     def get_session_summary(self) -> dict[str, Any]:
@@ -140,6 +199,11 @@ class CostTracker:
                 + self.session_metrics.total_output_tokens
             ),
             "total_cost": round(self.session_metrics.total_cost, 4),
+            "cached_calls": self.session_metrics.cached_calls,
+            "saved_cost": round(self.session_metrics.saved_cost, 4),
+            "discarded_calls": self.session_metrics.discarded_calls,
+            "discarded_cost": round(self.session_metrics.discarded_cost, 4),
+            "caches": self.get_cache_summary(),
         }
 
     def check_budget_alerts(self, daily_budget: float = 5.0) -> dict[str, Any]:
@@ -0,0 +1,115 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    """Hash of the exact text; embeddings are sensitive to every character"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache in a local SQLite file
+    Keyed by (model, text hash) and stored as float32 blobs, so query
+    embeddings survive restarts; ingestion bypasses it so a bulk run does not
+    evict them. Holds at most max_rows embeddings, evicting the oldest first. Calls block
+    on disk I/O; async code runs them in a worker thread
+    """
+
+    def __init__(self, path: str | Path, max_rows: int = 20_000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_rows = max_rows
+
+        # One connection, used by one worker thread at a time
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        # WAL lets the API read while an ingestion run writes
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " embedding BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._db.commit()
+        self._rows = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, model: str, texts: list[str]) -> dict[str, list[float]]:
+        """Cached embeddings for whichever of texts are present, by text"""
+        by_hash = {text_hash(text): text for text in texts}
+        found: dict[str, list[float]] = {}
+
+        hashes = list(by_hash)
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start : start + 500]
+                rows = self._db.execute(
+                    "SELECT text_hash, embedding FROM embeddings WHERE model = ?"
+                    f" AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk],
+                ).fetchall()
+                for key, blob in rows:
+                    found[by_hash[key]] = np.frombuffer(blob, np.float32).tolist()
+
+        self.hits += len(found)
+        self.misses += len(by_hash) - len(found)
+        return found
+
+    def set_many(self, model: str, items: Iterable[tuple[str, list[float]]]):
+        """Store embeddings for texts, evicting the oldest past max_rows"""
+        rows = [
+            (model, text_hash(text), np.asarray(vector, np.float32).tobytes())
+            for text, vector in items
+        ]
+        with self._lock:
+            # A text already cached by a concurrent caller has the same vector
+            inserted = self._db.executemany(
+                "INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?)", rows
+            ).rowcount
+            self._rows += inserted
+
+            if self._rows > self.max_rows:
+                # Evict down to 90% so pruning isn't repeated on every insert
+                excess = self._rows - self.max_rows * 9 // 10
+                self._db.execute(
+                    "DELETE FROM embeddings WHERE rowid IN"
+                    " (SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+                    (excess,),
+                )
+                self._rows = self._db.execute(
+                    "SELECT COUNT(*) FROM embeddings"
+                ).fetchone()[0]
+                self.evictions += excess
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get cache statistics"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "rows": self._rows,
+            "evictions": self.evictions,
+        }
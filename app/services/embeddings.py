@@ -1,7 +1,134 @@
-﻿class EmbeddingService:
-    def __init__(self):
-        pass
+﻿import asyncio
+import logging
+from typing import Any
+
+from app.core.config import settings
+from app.services.batching import MicroBatcher
+from app.services.cost_tracker import CostTracker
+from app.services.embedding_cache import EmbeddingCache
+from app.services.openai_client import OpenAIClient
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingService:
+    """
+    Batching front-end for text embeddings
+    Concurrent single-text requests are coalesced into list inputs, identical
+    texts are embedded once, and results are kept in a persistent cache
+    """
+
+    def __init__(
+        self,
+        openai_client: OpenAIClient | None = None,
+        cost_tracker: CostTracker | None = None,
+        cache_path: str | None = None,
+    ):
+        self.openai_client = openai_client or OpenAIClient()
+        self.cost_tracker = cost_tracker
+        self.model = settings.embedding_model
+        self.dimensions = settings.embedding_dimensions
+
+        cache_path = (
+            cache_path if cache_path is not None else settings.embedding_cache_path
+        )
+        self.cache = (
+            EmbeddingCache(cache_path, max_rows=settings.embedding_cache_max_rows)
+            if cache_path
+            else None
+        )
+
+        self.batcher = MicroBatcher(
+            self._embed_batch,
+            max_batch_size=settings.embedding_batch_max_size,
+            max_wait_ms=settings.embedding_batch_wait_ms,
+            name="embedding",
+        )
+
+    @property
+    def cache_model(self) -> str:
+        """Cache namespace; vectors differ by model and dimensions"""
+        return f"{self.model}:{self.dimensions or 'default'}"
 
     async def create_embedding(self, text: str) -> list[float]:
-        # Implement embedding generation
-        pass
+        """Create text embedding"""
+        if self.cache is not None:
+            # SQLite blocks; keep it off the event loop
+            cached = await asyncio.to_thread(
+                self.cache.get_many, self.cache_model, [text]
+            )
+            if text in cached:
+                return cached[text]
+
+        return await self.batcher.submit(text)
+
+    async def try_create_embedding(
+        self, text: str, timeout: float | None = None
+    ) -> list[float] | None:
+        """Embed within a time budget; None if the call is slow or fails"""
+        # Shielded: a call that overruns still completes and fills the cache
+        # for the next identical text
+        embedding = asyncio.ensure_future(self.create_embedding(text))
+        try:
+            return await asyncio.wait_for(asyncio.shield(embedding), timeout)
+        except TimeoutError:
+            logger.info(f"Embedding exceeded {timeout}s - continuing without it")
+            embedding.add_done_callback(lambda f: f.cancelled() or f.exception())
+        except Exception as e:
+            logger.warning(f"Embedding failed: {e}")
+
+        return None
+
+    async def create_embeddings(self, texts: list[str]) -> list[list[float]]:
+        """Create embeddings for many texts, e.g. document chunks"""
+        found = {}
+        if self.cache is not None:
+            found = await asyncio.to_thread(
+                self.cache.get_many, self.cache_model, texts
+            )
+
+        missing = [text for text in dict.fromkeys(texts) if text not in found]
+        size = self.batcher.max_batch_size
+        batches = [
+            missing[start : start + size] for start in range(0, len(missing), size)
+        ]
+
+        results = await asyncio.gather(*(self._embed_batch(b) for b in batches))
+        for batch, embeddings in zip(batches, results, strict=True):
+            found.update(zip(batch, embeddings, strict=True))
+
+        return [found[text] for text in texts]
+
+    async def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Embed unique texts in one API call, then cache and cost them"""
+        response = await self.openai_client.create_embeddings(
+            texts, model=self.model, dimensions=self.dimensions
+        )
+        embeddings = [
+            item.embedding for item in sorted(response.data, key=lambda d: d.index)
+        ]
+
+        if self.cost_tracker is not None and response.usage is not None:
+            await self.cost_tracker.track_embedding(
+                response.usage.total_tokens, model=self.model
+            )
+
+        if self.cache is not None:
+            await asyncio.to_thread(
+                self.cache.set_many,
+                self.cache_model,
+                list(zip(texts, embeddings, strict=True)),
+            )
+
+        return embeddings
+
+    async def close(self):
+        """Send pending batches and close the cache"""
+        await self.batcher.aclose()
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.close)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get cache and batching counters"""
+        stats = self.cache.get_stats() if self.cache is not None else {}
+        return {**stats, **self.batcher.get_stats()}
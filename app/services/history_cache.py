@@ -0,0 +1,172 @@
+import logging
+import sys
+import time
+from collections import OrderedDict, deque
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Rough per-message cost of the dict and deque slot
+MESSAGE_OVERHEAD_BYTES = 300
+
+
+class _History:
+    """Cached summary and latest unsummarized messages of one conversation"""
+
+    __slots__ = ("summary", "messages", "unsummarized", "size", "expires_at")
+
+    def __init__(self, summary: str | None, max_messages: int, expires_at: float):
+        self.summary = summary
+        self.messages: deque[dict[str, str]] = deque(maxlen=max_messages)
+        # Messages after the summary, cached or not; None if unknown
+        self.unsummarized: int | None = 0
+        self.size = 0
+        self.expires_at = expires_at
+
+
+class HistoryCache:
+    """
+    Read-through cache of recent chat history per conversation
+    Holds the summary and the last max_messages messages in the
+    {"role", "content"} form the pipeline consumes. Turns are appended as
+    they are written and summaries folded in place, so a conversation is read
+    from the database only on a miss. Conversations are evicted least
+    recently used to stay within max_bytes
+    """
+
+    def __init__(
+        self,
+        max_messages: int = 20,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 600.0,
+    ):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: OrderedDict[int, _History] = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(
+        self, conversation_id: int
+    ) -> tuple[str | None, list[dict[str, str]]] | None:
+        """Return (summary, messages) for a cached conversation, or None"""
+        entry = self._entries.get(conversation_id)
+        if entry is None or entry.expires_at < time.monotonic():
+            if entry is not None:
+                self.invalidate(conversation_id)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(conversation_id)
+        self.hits += 1
+        return entry.summary, list(entry.messages)
+
+    def put(
+        self,
+        conversation_id: int,
+        summary: str | None,
+        messages: list[dict[str, str]],
+        complete: bool = True,
+    ):
+        """
+        Cache history loaded from the database.
+
+        complete says messages are all the messages after the summary, rather
+        than the latest page of a longer tail.
+        """
+        self.invalidate(conversation_id)
+
+        entry = _History(
+            summary, self.max_messages, time.monotonic() + self.ttl_seconds
+        )
+        self._entries[conversation_id] = entry
+        self._extend(entry, messages)
+        entry.unsummarized = len(messages) if complete else None
+
+        if summary:
+            entry.size += sys.getsizeof(summary)
+            self._bytes += sys.getsizeof(summary)
+        self._evict()
+
+    def append(self, conversation_id: int, messages: list[dict[str, str]]):
+        """Add newly written messages to a cached conversation"""
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return
+
+        self._extend(entry, messages)
+        if entry.unsummarized is not None:
+            entry.unsummarized += len(messages)
+        self._evict()
+
+    def fold(self, conversation_id: int, summary: str, folded: int):
+        """Apply a summary update that absorbed the oldest `folded` messages"""
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return
+        if entry.unsummarized is None:
+            # Can't tell which cached messages were folded
+            self.invalidate(conversation_id)
+            return
+
+        entry.unsummarized = max(entry.unsummarized - folded, 0)
+        while len(entry.messages) > entry.unsummarized:
+            self._remove_oldest(entry)
+
+        change = sys.getsizeof(summary) - (
+            sys.getsizeof(entry.summary) if entry.summary else 0
+        )
+        entry.summary = summary
+        entry.size += change
+        self._bytes += change
+
+    def invalidate(self, conversation_id: int):
+        """Drop a conversation's cached history"""
+        entry = self._entries.pop(conversation_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _extend(self, entry: _History, messages: list[dict[str, str]]):
+        """Append messages, dropping the oldest past max_messages"""
+        for message in messages:
+            if len(entry.messages) == entry.messages.maxlen:
+                self._remove_oldest(entry)
+
+            entry.messages.append(message)
+
+            size = sys.getsizeof(message["content"]) + MESSAGE_OVERHEAD_BYTES
+            entry.size += size
+            self._bytes += size
+
+    def _remove_oldest(self, entry: _History):
+        message = entry.messages.popleft()
+
+        size = sys.getsizeof(message["content"]) + MESSAGE_OVERHEAD_BYTES
+        entry.size -= size
+        self._bytes -= size
+
+    def _evict(self):
+        """Evict least recently used conversations until within max_bytes"""
+        while self._bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get cache hit/miss counters and memory use"""
+        lookups = self.hits + self.misses
+
+        return {
+            "conversations": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any, NamedTuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+
+class IdempotencyKeyReusedError(ValueError):
+    """An idempotency key was sent again with a different request body"""
+
+
+class _Entry(NamedTuple):
+    fingerprint: str
+    task: asyncio.Task
+    expires_at: float
+
+
+class IdempotencyStore:
+    """
+    Bounded store of results by client-supplied idempotency key
+    A retry while the original is still running attaches to it; a retry
+    after it completed gets the stored result without recomputing
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 86400.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+        self.executed = 0
+        self.replayed = 0
+
+    async def run(
+        self, key: str, fingerprint: str, fn: Callable[[], Awaitable[R]]
+    ) -> R:
+        """Run fn once per key and return its (possibly stored) result"""
+        self._evict_expired()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                raise IdempotencyKeyReusedError(
+                    "Idempotency key was already used for a different request"
+                )
+
+            self.replayed += 1
+            return await asyncio.shield(entry.task)
+
+        task = asyncio.create_task(fn())
+        task.add_done_callback(lambda t: self._discard_failed(key, t))
+        self._entries[key] = _Entry(
+            fingerprint, task, time.monotonic() + self.ttl_seconds
+        )
+        self.executed += 1
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        # A client disconnecting must not cancel the computation its retry
+        # will attach to
+        return await asyncio.shield(task)
+
+    def forget(self, key: str):
+        """Drop a key so the next request with it is computed again"""
+        self._entries.pop(key, None)
+
+    def _discard_failed(self, key: str, task: asyncio.Task):
+        """Failed computations are not stored; a retry should run again"""
+        if task.cancelled() or task.exception() is not None:
+            entry = self._entries.get(key)
+            if entry is not None and entry.task is task:
+                del self._entries[key]
+
+    def _evict_expired(self):
+        """Drop entries past their TTL; entries are kept in expiry order"""
+        now = time.monotonic()
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at >= now:
+                break
+            del self._entries[key]
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get idempotency store counters"""
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "executed": self.executed,
+            "replayed": self.replayed,
+        }
@@ -1,7 +1,26 @@
-﻿import logging
+﻿import asyncio
+import hashlib
+import json
+import logging
+from collections.abc import AsyncIterator
+from contextlib import aclosing
 from typing import Any, TypedDict
 
+from app.core.config import settings
+from app.services.cost_tracker import CostTracker
+from app.services.embeddings import EmbeddingService
+from app.services.moderation_cache import normalize_text
 from app.services.openai_client import OpenAIClient
+from app.services.pipeline_graph import PipelineGraph, PipelineNode
+from app.services.prompt_builder import (
+    TOKENS_PER_REPLY,
+    PromptBuilder,
+    TokenCounter,
+)
+from app.services.retrieval import RetrievalService
+from app.services.semantic_cache import SemanticCache
+from app.services.single_flight import SingleFlight
+from app.services.stream_moderation import StreamModerator
 
 logger = logging.getLogger(__name__)
 
@@ -10,10 +29,14 @@ class ChatState(TypedDict):
     """State for the chat pipeline"""
 
     messages: list[dict[str, str]]
+    summary: str | None
     user_message: str
     context: str
+    documents: list[dict[str, Any]]
     response: str
     is_safe: bool
+    query_embedding: list[float] | None
+    cache_hit: bool
     metadata: dict[str, Any]
 
 
@@ -22,44 +45,171 @@ class LangGraphPipeline:
     Simple LangGraph-inspired pipeline for parenting chat
     """
 
-    def __init__(self):
-        self.openai_client = OpenAIClient()
+    # Generation parameters
+    model = "gpt-4o-mini"
+    max_tokens = 500
+    temperature = 0.7
+
+    SYSTEM_PROMPT = """
+        You are a helpful parenting assistant. Provide supportive, evidence-based advice
+        while being empathetic and understanding. Always prioritize child safety and well-being.
+        """
+
+    OUTPUT_FALLBACK = "I apologize, but I need to rephrase my response. Let me try a different approach to help you."
+
+    def __init__(
+        self,
+        openai_client: OpenAIClient | None = None,
+        cost_tracker: CostTracker | None = None,
+        retrieval: RetrievalService | None = None,
+        embeddings: EmbeddingService | None = None,
+    ):
+        self.openai_client = openai_client or OpenAIClient()
+        self.cost_tracker = cost_tracker or CostTracker()
+        self.embeddings = embeddings or EmbeddingService(
+            self.openai_client, cost_tracker=self.cost_tracker
+        )
+        self.retrieval = retrieval or RetrievalService(embeddings=self.embeddings)
+
+        self.semantic_cache = None
+        if settings.semantic_cache_enabled:
+            self.semantic_cache = SemanticCache(
+                max_entries=settings.semantic_cache_max_entries,
+                threshold=settings.semantic_cache_threshold,
+                ttl_seconds=settings.semantic_cache_ttl_seconds,
+            )
+            self.cost_tracker.register_cache(
+                "semantic_response", self.semantic_cache.get_stats
+            )
+
+        self.token_counter = TokenCounter(
+            model=self.model, max_entries=settings.token_count_cache_size
+        )
+        self.prompt_builder = PromptBuilder(
+            self.token_counter,
+            budget_tokens=settings.prompt_token_budget,
+            context_share=settings.prompt_context_share,
+        )
+        self.cost_tracker.register_cache("token_counts", self.token_counter.get_stats)
+
+        self.single_flight = SingleFlight()
+        self.cost_tracker.register_cache("single_flight", self.single_flight.get_stats)
+
+        self.graph = self._build_graph()
+
+    def _build_graph(self) -> PipelineGraph:
+        """Declare pipeline steps by the ChatState keys they read and write"""
+        return PipelineGraph(
+            nodes=[
+                PipelineNode(
+                    name="moderate_input",
+                    run=self._moderate_input,
+                    inputs=("user_message",),
+                    outputs=("is_safe",),
+                    gate=True,
+                ),
+                PipelineNode(
+                    name="embed_query",
+                    run=self._embed_query,
+                    inputs=("messages", "summary", "user_message"),
+                    outputs=("query_embedding",),
+                ),
+                PipelineNode(
+                    name="add_context",
+                    run=self._add_context,
+                    inputs=("user_message", "query_embedding"),
+                    outputs=("context", "documents"),
+                ),
+                PipelineNode(
+                    name="lookup_cache",
+                    run=self._lookup_cache,
+                    inputs=("messages", "summary", "query_embedding"),
+                    outputs=("cache_hit",),
+                ),
+                PipelineNode(
+                    name="generate_response",
+                    run=self._generate_response,
+                    inputs=(
+                        "messages",
+                        "summary",
+                        "user_message",
+                        "context",
+                        "documents",
+                        "cache_hit",
+                    ),
+                    outputs=("response",),
+                ),
+                PipelineNode(
+                    name="moderate_output",
+                    run=self._moderate_output,
+                    inputs=("response",),
+                    outputs=("response", "is_safe"),
+                    gate=True,
+                ),
+            ],
+            initial_keys=("messages", "summary", "user_message", "metadata"),
+        )
 
     async def process_chat(
-        self, user_message: str, conversation_history: list[dict] = None
+        self,
+        user_message: str,
+        conversation_history: list[dict] = None,
+        summary: str | None = None,
     ) -> dict[str, Any]:
         """
-        Process chat through pipeline steps:
-        1. Input moderation
-        2. Context retrieval (placeholder)
-        3. Response generation
-        4. Output moderation
+        Process chat through the pipeline graph:
+        1. Input moderation     } run concurrently; generation starts
+        2. Context retrieval    } speculatively and is cancelled if
+        3. Semantic cache check } input moderation flags the message,
+        4. Response generation  } or skipped on a cache hit
+        5. Output moderation
+
+        Identical concurrent requests share a single pipeline run.
+        summary is the rolling summary of turns older than the history.
         """
+        key = self._request_key(user_message, conversation_history, summary)
 
-        # Initialize state
-        state = ChatState(
-            messages=conversation_history or [],
-            user_message=user_message,
-            context="",
-            response="",
-            is_safe=True,
-            metadata={},
+        return await self.single_flight.do(
+            key, lambda: self._run_chat(user_message, conversation_history, summary)
         )
 
-        try:
-            # Step 1: Input moderation
-            state = await self._moderate_input(state)
-            if not state["is_safe"]:
-                return self._create_safety_response(state)
+    def _request_key(
+        self,
+        user_message: str,
+        conversation_history: list[dict] | None,
+        summary: str | None = None,
+    ) -> str:
+        """Identify a request by its message, history and model parameters"""
+        payload = json.dumps(
+            {
+                "message": normalize_text(user_message),
+                "history": conversation_history or [],
+                "summary": summary,
+                "model": self.model,
+                "max_tokens": self.max_tokens,
+                "temperature": self.temperature,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
-            # Step 2: Add context (placeholder for now)
-            state = await self._add_context(state)
+    async def _run_chat(
+        self,
+        user_message: str,
+        conversation_history: list[dict] | None,
+        summary: str | None = None,
+    ) -> dict[str, Any]:
+        """Run the pipeline graph once for a request"""
+
+        # Initialize state
+        state = self._initial_state(user_message, conversation_history, summary)
 
-            # Step 3: Generate response
-            state = await self._generate_response(state)
+        try:
+            halted_by = await self.graph.run(state)
+            if halted_by == "moderate_input":
+                return await self._create_safety_response(state)
 
-            # Step 4: Output moderation
-            state = await self._moderate_output(state)
+            await self._store_in_cache(state)
 
             return {
                 "response": state["response"],
@@ -75,81 +225,394 @@ class LangGraphPipeline:
                 "metadata": {"error": str(e)},
             }
 
+    async def stream_chat(
+        self,
+        user_message: str,
+        conversation_history: list[dict] = None,
+        summary: str | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Process chat through the same pipeline steps as process_chat, but
+        yield response tokens as soon as the model produces them.
+
+        Yields event dicts:
+        - {"type": "token", "content": str} for each content delta
+        - {"type": "replace", "content": str} if a window of the response is
+          flagged by output moderation and must replace what was streamed
+        - {"type": "done", "response", "is_safe", "metadata"} as the final event
+        """
+
+        state = self._initial_state(user_message, conversation_history, summary)
+
+        # Step 1: Input moderation runs alongside context and generation
+        input_check = asyncio.create_task(self._moderate_input(state))
+
+        try:
+            # Step 2: Add context and check the response cache
+            await self._embed_query(state)
+            await asyncio.gather(self._add_context(state), self._lookup_cache(state))
+
+            if state["cache_hit"]:
+                await input_check
+                if not state["is_safe"]:
+                    result = await self._create_safety_response(state)
+                    yield {"type": "token", "content": result["response"]}
+                    yield {"type": "done", **result}
+                    return
+
+                yield {"type": "token", "content": state["response"]}
+                yield {
+                    "type": "done",
+                    "response": state["response"],
+                    "is_safe": True,
+                    "metadata": state["metadata"],
+                }
+                return
+
+            # Steps 3 + 4: Stream response, moderating it in windows as it
+            # is generated instead of after it completes
+            moderator = StreamModerator(self.openai_client)
+            async with aclosing(self._stream_response(state)) as deltas:
+                async with aclosing(
+                    self._hold_until_checked(deltas, input_check, state)
+                ) as checked:
+                    async for text in moderator.moderate(checked):
+                        yield {"type": "token", "content": text}
+
+            if not state["is_safe"]:
+                # Input was flagged; nothing has been released yet
+                result = await self._create_safety_response(state)
+                yield {"type": "token", "content": result["response"]}
+                yield {"type": "done", **result}
+                return
+
+            state["metadata"]["moderation_windows"] = moderator.windows_checked
+            if moderator.flagged:
+                state["is_safe"] = False
+                state["response"] = self.OUTPUT_FALLBACK
+                state["metadata"]["moderation_reason"] = "Output flagged by moderation"
+                yield {"type": "replace", "content": state["response"]}
+
+            await self._store_in_cache(state)
+
+            yield {
+                "type": "done",
+                "response": state["response"],
+                "is_safe": state["is_safe"],
+                "metadata": state["metadata"],
+            }
+
+        except Exception as e:
+            logger.error(f"Streaming pipeline error: {str(e)}")
+            fallback = "I apologize, but I'm having trouble processing your request right now. Please try again."
+            yield {"type": "replace", "content": fallback}
+            yield {
+                "type": "done",
+                "response": fallback,
+                "is_safe": True,
+                "metadata": {"error": str(e)},
+            }
+
+        finally:
+            input_check.cancel()
+
+    async def _hold_until_checked(
+        self,
+        deltas: AsyncIterator[str],
+        input_check: asyncio.Task,
+        state: ChatState,
+    ) -> AsyncIterator[str]:
+        """
+        Buffer speculatively generated deltas until input moderation
+        finishes, then release them; stop the stream if the input is flagged
+        """
+        held = []
+
+        async for delta in deltas:
+            if not input_check.done():
+                held.append(delta)
+                continue
+
+            if not state["is_safe"]:
+                return
+
+            if held:
+                yield "".join(held)
+                held = []
+            yield delta
+
+        await input_check
+        if state["is_safe"] and held:
+            yield "".join(held)
+
+    def _initial_state(
+        self,
+        user_message: str,
+        conversation_history: list[dict] | None,
+        summary: str | None = None,
+    ) -> ChatState:
+        """Create the starting pipeline state"""
+        return ChatState(
+            messages=conversation_history or [],
+            summary=summary,
+            user_message=user_message,
+            context="",
+            documents=[],
+            response="",
+            is_safe=True,
+            query_embedding=None,
+            cache_hit=False,
+            metadata={},
+        )
+
     async def _moderate_input(self, state: ChatState) -> ChatState:
         """Moderate user input"""
         try:
             moderation = await self.openai_client.moderate_content(
                 state["user_message"]
             )
-            state["is_safe"] = not moderation.flagged
-
+            # Only ever clear is_safe; this may finish after output moderation
             if moderation.flagged:
+                state["is_safe"] = False
                 state["metadata"]["moderation_reason"] = "Input flagged by moderation"
 
         except Exception as e:
-            logger.warning(f"Input moderation failed: {e}")
             # Fail open for now
-            state["is_safe"] = True
+            logger.warning(f"Input moderation failed: {e}")
+
+        return state
+
+    async def _embed_query(self, state: ChatState) -> ChatState:
+        """Embed the user message once for retrieval and the semantic cache"""
+        cacheable = self.semantic_cache is not None and not (
+            state["messages"] or state["summary"]
+        )
+        if not cacheable and len(self.retrieval.store) == 0:
+            return state
+
+        # Both consumers degrade gracefully without an embedding; retrieval
+        # falls back to lexical search
+        state["query_embedding"] = await self.embeddings.try_create_embedding(
+            state["user_message"], timeout=settings.retrieval_embedding_timeout
+        )
 
         return state
 
     async def _add_context(self, state: ChatState) -> ChatState:
-        """Add relevant context (placeholder for RAG)"""
-        # TODO: Implement vector search and retrieval
-        state[
-            "context"
-        ] = """
-        You are a helpful parenting assistant. Provide supportive, evidence-based advice 
-        while being empathetic and understanding. Always prioritize child safety and well-being.
-        """
+        """Add the system prompt and relevant parenting resources"""
+        state["context"] = self.SYSTEM_PROMPT
+
+        try:
+            # Scoring is CPU-bound numpy that releases the GIL; off the loop
+            # it doesn't stall other requests and streams
+            docs = await asyncio.to_thread(
+                self.retrieval.hybrid_search,
+                state["user_message"],
+                state["query_embedding"],
+                top_k=settings.retrieval_top_k,
+            )
+        except Exception as e:
+            # Resources improve an answer; they are not worth failing it over
+            logger.error(f"Retrieval failed - answering without resources: {e}")
+            docs = []
+
+        if docs:
+            # Formatted into the prompt, within budget, by _build_messages
+            state["documents"] = docs
+            state["metadata"]["retrieved_sources"] = [doc["source"] for doc in docs]
+
         return state
 
-    async def _generate_response(self, state: ChatState) -> ChatState:
-        """Generate AI response"""
+    async def _lookup_cache(self, state: ChatState) -> ChatState:
+        """Serve a cached answer to a semantically similar question"""
+        # Only history-free turns are answered from cache
+        if (
+            self.semantic_cache is None
+            or state["messages"]
+            or state["summary"]
+            or state["query_embedding"] is None
+        ):
+            return state
+
+        cached = self.semantic_cache.lookup(state["query_embedding"])
+        if cached is None:
+            return state
+
+        state["cache_hit"] = True
+        state["response"] = cached["response"]
+        state["metadata"]["model"] = cached["model"]
+        state["metadata"]["cache_hit"] = True
+
+        usage = cached["usage"]
+        await self.cost_tracker.track_cache_hit(
+            usage["prompt_tokens"], usage["completion_tokens"], cached["model"]
+        )
 
-        # Build conversation history
-        messages = [{"role": "system", "content": state["context"]}]
+        return state
 
-        # Add conversation history
-        messages.extend(state["messages"][-5:])  # Last 5 messages for context
+    async def _store_in_cache(self, state: ChatState):
+        """Cache a freshly generated, moderated answer"""
+        if (
+            self.semantic_cache is None
+            or state["messages"]
+            or state["summary"]
+            or state["cache_hit"]
+            or not state["is_safe"]
+            or state["query_embedding"] is None
+            or "usage" not in state["metadata"]
+        ):
+            return
+
+        self.semantic_cache.store(
+            state["query_embedding"],
+            {
+                "response": state["response"],
+                "model": state["metadata"]["model"],
+                "usage": state["metadata"]["usage"],
+            },
+        )
 
-        # Add current user message
-        messages.append({"role": "user", "content": state["user_message"]})
+    def _build_messages(self, state: ChatState) -> list[dict[str, str]]:
+        """Build the prompt messages for response generation"""
+        messages, usage = self.prompt_builder.build(
+            system_prompt=state["context"],
+            user_message=state["user_message"],
+            documents=state["documents"],
+            history=state["messages"],
+            summary=state["summary"],
+        )
+        state["metadata"]["prompt"] = usage
+
+        return messages
+
+    async def _generate_response(self, state: ChatState) -> ChatState:
+        """Generate AI response"""
+        if state["cache_hit"]:
+            return state
 
         # Generate response
         response = await self.openai_client.chat_completion(
-            messages=messages, model="gpt-4o-mini", max_tokens=500, temperature=0.7
+            messages=self._build_messages(state),
+            model=self.model,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
         )
 
         state["response"] = response.choices[0].message.content
-        state["metadata"]["model"] = "gpt-4o-mini"
+        state["metadata"]["model"] = self.model
+        state["metadata"]["usage"] = self._usage_to_dict(response.usage)
+
+        await self.cost_tracker.track_chat_completion(
+            response.usage.prompt_tokens, response.usage.completion_tokens, self.model
+        )
+
+        return state
+
+    async def _stream_response(self, state: ChatState) -> AsyncIterator[str]:
+        """Generate AI response, yielding content deltas as they arrive"""
+
+        messages = self._build_messages(state)
+        stream = await self.openai_client.chat_completion(
+            messages=messages,
+            model=self.model,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        state["metadata"]["model"] = self.model
+
+        chunks = []
+        try:
+            async for chunk in stream:
+                # The final chunk carries usage and has no choices
+                if chunk.usage is not None:
+                    state["metadata"]["usage"] = self._usage_to_dict(chunk.usage)
+                    await self.cost_tracker.track_chat_completion(
+                        chunk.usage.prompt_tokens,
+                        chunk.usage.completion_tokens,
+                        self.model,
+                    )
+
+                if not chunk.choices:
+                    continue
+
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    chunks.append(delta)
+                    yield delta
+
+            state["response"] = "".join(chunks)
+
+        finally:
+            # Closed early (moderation stopped it) or failed before the usage
+            # chunk: the tokens were still billed
+            if "usage" not in state["metadata"]:
+                await self._track_estimated_usage(state, messages, chunks)
+
+    async def _track_estimated_usage(
+        self, state: ChatState, messages: list[dict[str, str]], chunks: list[str]
+    ):
+        """
+        Record usage the stream never reported, counted locally; completion
+        tokens generated but not yet received are missed
+        """
+        prompt_tokens = TOKENS_PER_REPLY + sum(
+            self.token_counter.count_message(message) for message in messages
+        )
+        completion_tokens = self.token_counter.count("".join(chunks))
+
         state["metadata"]["usage"] = {
-            "prompt_tokens": response.usage.prompt_tokens,
-            "completion_tokens": response.usage.completion_tokens,
-            "total_tokens": response.usage.total_tokens,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
         }
+        state["metadata"]["usage_estimated"] = True
+        await self.cost_tracker.track_chat_completion(
+            prompt_tokens, completion_tokens, self.model
+        )
 
-        return state
+    @staticmethod
+    def _usage_to_dict(usage) -> dict[str, int]:
+        """Convert an OpenAI usage object to plain metadata"""
+        return {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+        }
 
     async def _moderate_output(self, state: ChatState) -> ChatState:
         """Moderate AI output"""
+        # Cached answers were moderated before they were stored
+        if state["cache_hit"]:
+            return state
+
         try:
             moderation = await self.openai_client.moderate_content(state["response"])
             if moderation.flagged:
                 state["is_safe"] = False
-                state["response"] = (
-                    "I apologize, but I need to rephrase my response. Let me try a different approach to help you."
-                )
+                state["response"] = self.OUTPUT_FALLBACK
 
         except Exception as e:
             logger.warning(f"Output moderation failed: {e}")
 
         return state
 
-    def _create_safety_response(self, state: ChatState) -> dict[str, Any]:
+    async def _create_safety_response(self, state: ChatState) -> dict[str, Any]:
         """Create response for unsafe content"""
+        # A speculative generation may have finished before the input was
+        # flagged; it was billed but is never delivered
+        usage = state["metadata"].get("usage")
+        if usage is not None and not state["cache_hit"]:
+            await self.cost_tracker.track_discarded_completion(
+                usage["prompt_tokens"], usage["completion_tokens"], self.model
+            )
+
         return {
             "response": "I understand you're looking for parenting advice, but I need you to rephrase your question in a way that's appropriate for our platform.",
             "is_safe": False,
-            "metadata": state["metadata"],
+            "metadata": {
+                "flagged": True,
+                "moderation_reason": state["metadata"].get("moderation_reason"),
+            },
         }
@@ -0,0 +1,157 @@
+import json
+import logging
+import re
+from collections import Counter
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+MAX_TOKEN_CHARS = 40
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by do for from has have how i if in is it my "
+    "of on or so that the their them they this to was what when with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Casefolded word tokens minus stopwords; unstemmed so "RSV" stays exact"""
+    return [
+        token
+        for token in TOKEN_PATTERN.findall(text.casefold())
+        if token not in STOPWORDS and len(token) <= MAX_TOKEN_CHARS
+    ]
+
+
+class BM25Index:
+    """
+    Lexical inverted index with BM25 scoring
+    Postings are stored per term as contiguous slices of two flat arrays
+    (document ids and precomputed BM25 term weights), so scoring a query is
+    a few array slices and one bincount
+    """
+
+    ARRAYS = ("offsets", "doc_ids", "weights", "idf")
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.n_docs = 0
+
+        self.vocab: dict[str, int] = {}
+        self.offsets = np.zeros(1, dtype=np.int64)  # Term -> postings slice
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.idf = np.zeros(0, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    @classmethod
+    def build(
+        cls, texts: Iterable[str], k1: float = 1.2, b: float = 0.75
+    ) -> "BM25Index":
+        """Index documents; row i of the index is the i-th text"""
+        index = cls(k1=k1, b=b)
+        term_ids: list[int] = []
+        doc_ids: list[int] = []
+        term_freqs: list[int] = []
+        lengths: list[int] = []
+
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                term_ids.append(index.vocab.setdefault(term, len(index.vocab)))
+                doc_ids.append(doc)
+                term_freqs.append(tf)
+
+        index.n_docs = len(lengths)
+        if not term_ids:
+            return index
+
+        terms = np.asarray(term_ids, dtype=np.int64)
+        docs = np.asarray(doc_ids, dtype=np.int32)
+        tf = np.asarray(term_freqs, dtype=np.float32)
+        doc_lengths = np.asarray(lengths, dtype=np.float32)
+
+        # BM25 term weight, everything but idf, computed once at build time
+        norm = 1 - b + b * doc_lengths[docs] / max(doc_lengths.mean(), 1.0)
+        weights = tf * (k1 + 1) / (tf + k1 * norm)
+
+        # Group postings by term; stable sort keeps doc ids ascending
+        order = np.argsort(terms, kind="stable")
+        df = np.bincount(terms, minlength=len(index.vocab))
+
+        index.doc_ids = docs[order]
+        index.weights = weights[order].astype(np.float32)
+        index.offsets = np.concatenate(([0], np.cumsum(df)))
+        index.idf = np.log1p((index.n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        logger.info(
+            f"Built BM25 index: {index.n_docs} documents, {len(index.vocab)} terms"
+        )
+        return index
+
+    def search(self, query: str, top_k: int = 5) -> list[tuple[int, float]]:
+        """Return (row, BM25 score) pairs for the top_k matching rows"""
+        terms = [
+            self.vocab[t] for t in dict.fromkeys(tokenize(query)) if t in self.vocab
+        ]
+        if not terms:
+            return []
+
+        ids = np.concatenate(
+            [self.doc_ids[self.offsets[t] : self.offsets[t + 1]] for t in terms]
+        )
+        contributions = np.concatenate(
+            [
+                self.weights[self.offsets[t] : self.offsets[t + 1]] * self.idf[t]
+                for t in terms
+            ]
+        )
+
+        # Sum per document over just the matching rows
+        rows, inverse = np.unique(ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions)
+
+        k = min(top_k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def save(self, path: str | Path):
+        """Persist the index as a directory of .npy arrays and the vocabulary"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        for name in self.ARRAYS:
+            np.save(path / f"{name}.npy", getattr(self, name))
+
+        # Tokens never contain newlines, so the vocabulary is one per line
+        (path / "vocab.txt").write_text("\n".join(self.vocab), encoding="utf-8")
+        (path / "params.json").write_text(
+            json.dumps({"k1": self.k1, "b": self.b, "n_docs": self.n_docs})
+        )
+        logger.info(f"Saved BM25 index ({self.n_docs} documents) to {path}")
+
+    @classmethod
+    def load(cls, path: str | Path) -> "BM25Index":
+        """Load an index written by save(), memory-mapping the postings"""
+        path = Path(path)
+        params = json.loads((path / "params.json").read_text())
+
+        index = cls(k1=params["k1"], b=params["b"])
+        index.n_docs = params["n_docs"]
+
+        terms = (path / "vocab.txt").read_text(encoding="utf-8")
+        index.vocab = {t: i for i, t in enumerate(terms.split("\n"))} if terms else {}
+        for name in cls.ARRAYS:
+            setattr(index, name, np.load(path / f"{name}.npy", mmap_mode="r"))
+
+        logger.info(f"Mapped BM25 index ({index.n_docs} documents) from {path}")
+        return index
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import crud
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriter:
+    """
+    Write-behind persistence for chat messages
+    Requests enqueue rows and return; a background task inserts everything
+    queued with one executemany and one commit per flush, every
+    flush_interval_ms or as soon as max_batch_rows are waiting. Pending rows
+    are flushed on close, so a graceful shutdown loses nothing; rows enqueued
+    once closed are logged and dropped. on_commit and on_drop are called with
+    each conversation id in a batch once it is written or given up on
+    """
+
+    # Failed batches are retried this many times before being dropped
+    MAX_ATTEMPTS = 3
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        max_batch_rows: int = 200,
+        flush_interval_ms: float = 5.0,
+        on_commit: Callable[[int], None] | None = None,
+        on_drop: Callable[[int], None] | None = None,
+    ):
+        self.session_factory = session_factory
+        self.max_batch_rows = max_batch_rows
+        self.flush_interval_ms = flush_interval_ms
+        self.on_commit = on_commit
+        self.on_drop = on_drop
+
+        self._pending: list[dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._closing = False
+        self._closed = False
+        self._task: asyncio.Task | None = None
+
+        self.rows_enqueued = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.flushes = 0
+
+    def start(self):
+        """Start the background flush task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, rows: list[dict[str, Any]]):
+        """Queue Message rows (column -> value) for the next flush"""
+        if self._closed:
+            # A request finishing during shutdown; its answer is already sent
+            logger.error(f"Message writer closed - dropping {len(rows)} messages")
+            self.rows_dropped += len(rows)
+            self._notify(self.on_drop, rows)
+            return
+
+        self._pending.extend(rows)
+        self.rows_enqueued += len(rows)
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch_rows:
+            self._full.set()
+
+    async def _run(self):
+        """Flush queued rows until closed"""
+        while not self._closing:
+            await self._wakeup.wait()
+            if not self._full.is_set():
+                # Let rows from concurrent requests gather into this batch
+                try:
+                    await asyncio.wait_for(
+                        self._full.wait(), timeout=self.flush_interval_ms / 1000
+                    )
+                except TimeoutError:
+                    pass
+
+            await self._flush()
+
+    async def _flush(self):
+        """Write everything queued as one batch"""
+        self._wakeup.clear()
+        self._full.clear()
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            try:
+                async with self.session_factory() as db:
+                    await crud.create_messages(db, batch)
+                break
+            except Exception as e:
+                logger.error(
+                    f"Writing {len(batch)} messages failed "
+                    f"(attempt {attempt}/{self.MAX_ATTEMPTS}): {e}"
+                )
+                if attempt < self.MAX_ATTEMPTS:
+                    await asyncio.sleep(0.1 * attempt)
+        else:
+            self.rows_dropped += len(batch)
+            self._notify(self.on_drop, batch)
+            return
+
+        self.flushes += 1
+        self.rows_written += len(batch)
+        self._notify(self.on_commit, batch)
+
+    @staticmethod
+    def _notify(callback: Callable[[int], None] | None, batch: list[dict[str, Any]]):
+        """Call back once per conversation in a batch"""
+        if callback is None:
+            return
+        for conversation_id in dict.fromkeys(row["conversation_id"] for row in batch):
+            callback(conversation_id)
+
+    async def aclose(self):
+        """Stop the background task and write everything still queued"""
+        self._closing = True
+        if self._task is not None:
+            # Wake the loop for a last pass; a flush in progress completes
+            self._wakeup.set()
+            self._full.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        # Rows queued by requests finishing meanwhile go in further batches
+        await self._flush()
+        while self._pending:
+            await self._flush()
+        self._closed = True
+        logger.info(f"Message writer closed ({self.rows_written} rows written)")
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get write-behind counters"""
+        return {
+            "rows_enqueued": self.rows_enqueued,
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "flushes": self.flushes,
+            "pending": len(self._pending),
+            "average_batch_rows": round(self.rows_written / max(self.flushes, 1), 2),
+        }
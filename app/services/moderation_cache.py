@@ -0,0 +1,83 @@
+import hashlib
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different inputs share a cache entry"""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split()).casefold()
+
+
+def content_hash(text: str) -> str:
+    """Hash of the normalized text, used as the cache key"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class ModerationCache:
+    """
+    Bounded moderation result cache
+    Keyed by normalized-text hash with LRU eviction and a TTL
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl_seconds: float = 3600.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (expires_at, result), oldest first
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, text: str) -> Any | None:
+        """Return the cached result for text, or None"""
+        key = content_hash(text)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def set(self, text: str, result: Any):
+        """Store a moderation result, evicting the least recently used"""
+        key = content_hash(text)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, result)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop all cached results"""
+        self._entries.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get cache hit/miss counters"""
+        lookups = self.hits + self.misses
+
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
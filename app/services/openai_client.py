@@ -1,8 +1,11 @@
 ﻿import logging
 
+import httpx
 from openai import AsyncOpenAI
 
 from app.core.config import settings
+from app.services.batching import MicroBatcher
+from app.services.moderation_cache import ModerationCache
 
 logger = logging.getLogger(__name__)
 
@@ -12,19 +15,33 @@ class OpenAIClient:
     Centralized OpenAI API interface
     """
 
-    def __init__(self):
+    def __init__(self, http_client: httpx.AsyncClient | None = None):
         # Get the key from settings and clean it
         api_key = settings.openai_api_key.strip() if settings.openai_api_key else None
 
         if not api_key:
             raise ValueError("OpenAI API key not configured in settings")
 
-        # Explicitly pass the API key to the client
-        self.client = AsyncOpenAI(api_key=api_key)
+        # Explicitly pass the API key to the client; a shared http_client
+        # lets every OpenAIClient reuse one connection pool
+        self.client = AsyncOpenAI(
+            api_key=api_key, http_client=http_client, timeout=settings.openai_timeout
+        )
         logger.info(
             f"OpenAI client initialized with key: {api_key[:15]}...{api_key[-4:]}"
         )
 
+        self.moderation_cache = ModerationCache(
+            max_size=settings.moderation_cache_size,
+            ttl_seconds=settings.moderation_cache_ttl_seconds,
+        )
+        self.moderation_batcher = MicroBatcher(
+            self._moderate_batch,
+            max_batch_size=settings.moderation_batch_max_size,
+            max_wait_ms=settings.moderation_batch_wait_ms,
+            name="moderation",
+        )
+
     async def chat_completion(
         self,
         messages: list[dict[str, str]],
@@ -48,22 +65,64 @@ class OpenAIClient:
             logger.error(f"OpenAI chat completion error: {str(e)}")
             raise
 
-    async def create_embedding(self, text: str, model: str = "text-embedding-3-small"):
+    async def create_embedding(
+        self,
+        text: str,
+        model: str = "text-embedding-3-small",
+        dimensions: int | None = None,
+    ):
         """Create text embedding"""
         try:
-            response = await self.client.embeddings.create(model=model, input=text)
+            kwargs = {"dimensions": dimensions} if dimensions else {}
+            response = await self.client.embeddings.create(
+                model=model, input=text, **kwargs
+            )
             return response.data[0].embedding
 
         except Exception as e:
             logger.error(f"OpenAI embedding error: {str(e)}")
             raise
 
+    async def create_embeddings(
+        self,
+        texts: list[str],
+        model: str = "text-embedding-3-small",
+        dimensions: int | None = None,
+    ):
+        """Create embeddings for several texts in a single API call"""
+        try:
+            kwargs = {"dimensions": dimensions} if dimensions else {}
+            response = await self.client.embeddings.create(
+                model=model, input=texts, **kwargs
+            )
+            return response
+
+        except Exception as e:
+            logger.error(f"OpenAI embedding error: {str(e)}")
+            raise
+
     async def moderate_content(self, text: str):
         """Moderate content using OpenAI moderation API"""
+        cached = self.moderation_cache.get(text)
+        if cached is not None:
+            return cached
+
         try:
-            response = await self.client.moderations.create(input=text)
-            return response.results[0]
+            # Concurrent calls are sent together as one list input
+            result = await self.moderation_batcher.submit(text)
+            self.moderation_cache.set(text, result)
+            return result
 
         except Exception as e:
             logger.error(f"OpenAI moderation error: {str(e)}")
             raise
+
+    async def _moderate_batch(self, texts: list[str]) -> list:
+        """Moderate several texts in a single API call"""
+        response = await self.client.moderations.create(input=texts)
+        return response.results
+
+    async def close(self):
+        """Flush pending batches and close the underlying HTTP connection pool"""
+        await self.moderation_batcher.aclose()
+        await self.client.close()
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+State = dict[str, Any]
+
+
+@dataclass(frozen=True)
+class PipelineNode:
+    """A single pipeline step and the state keys it reads and writes"""
+
+    name: str
+    run: Callable[[State], Awaitable[State]]
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+    # A gate halts the whole graph if it leaves state["is_safe"] False
+    gate: bool = False
+
+
+class PipelineGraph:
+    """
+    Small dependency-aware executor for pipeline steps
+    Runs every node as soon as its inputs are available, so independent
+    nodes run concurrently. Nodes that don't depend on a gate run
+    speculatively and are cancelled if the gate fails.
+    """
+
+    def __init__(self, nodes: list[PipelineNode], initial_keys: tuple[str, ...]):
+        self.nodes = nodes
+        self.initial_keys = frozenset(initial_keys)
+        self._validate()
+
+    def _validate(self):
+        """Check that every input can be produced and the graph is acyclic"""
+        available = set(self.initial_keys)
+        remaining = list(self.nodes)
+
+        while remaining:
+            ready = [n for n in remaining if set(n.inputs) <= available]
+            if not ready:
+                missing = {n.name: set(n.inputs) - available for n in remaining}
+                raise ValueError(f"Pipeline graph has unsatisfiable inputs: {missing}")
+
+            for node in ready:
+                available.update(node.outputs)
+                remaining.remove(node)
+
+    async def run(self, state: State) -> str | None:
+        """
+        Run the graph to completion on the shared state.
+
+        Returns the name of the gate node that halted the graph, or None if
+        every node completed. Exceptions from any node cancel the rest and
+        propagate to the caller.
+        """
+        available = set(self.initial_keys)
+        pending = list(self.nodes)
+        running: dict[asyncio.Task, PipelineNode] = {}
+
+        try:
+            while pending or running:
+                for node in [n for n in pending if set(n.inputs) <= available]:
+                    pending.remove(node)
+                    running[asyncio.create_task(node.run(state))] = node
+
+                done, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in done:
+                    node = running.pop(task)
+                    task.result()  # Re-raise node errors
+
+                    if node.gate and not state["is_safe"]:
+                        logger.info(f"Pipeline halted by gate: {node.name}")
+                        return node.name
+
+                    available.update(node.outputs)
+
+            return None
+
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
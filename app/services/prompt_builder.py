@@ -0,0 +1,193 @@
+import logging
+import math
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Chat format overhead: tokens wrapping each message, and priming the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+CONTEXT_HEADING = "\nRelevant context from parenting resources:\n"
+SUMMARY_HEADING = "\nSummary of the earlier conversation:\n"
+
+
+def _load_encoding(model: str):
+    """tiktoken encoding for a model, or None to estimate from length"""
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("tiktoken not installed - estimating tokens from length")
+        return None
+
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use, which fails offline
+        logger.warning(f"tiktoken encoding unavailable - estimating tokens: {e}")
+        return None
+
+
+class TokenCounter:
+    """
+    Local token counting with a bounded cache of counts
+    History messages and retrieved chunks recur on every turn, so each text
+    is tokenized once and its count reused
+    """
+
+    # Fallback estimate when tiktoken is unavailable
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, model: str = "gpt-4o-mini", max_entries: int = 50_000):
+        self.model = model
+        self.max_entries = max_entries
+        self.encoding = _load_encoding(model)
+
+        self._counts: OrderedDict[str, int] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, text: str) -> int:
+        """Number of tokens in text"""
+        count = self._counts.get(text)
+        if count is not None:
+            self._counts.move_to_end(text)
+            self.hits += 1
+            return count
+
+        self.misses += 1
+        if self.encoding is not None:
+            count = len(self.encoding.encode(text, disallowed_special=()))
+        else:
+            count = math.ceil(len(text) / self.CHARS_PER_TOKEN)
+
+        self._counts[text] = count
+        if len(self._counts) > self.max_entries:
+            self._counts.popitem(last=False)
+
+        return count
+
+    def count_message(self, message: dict[str, str]) -> int:
+        """Tokens a chat message costs, including format overhead"""
+        return TOKENS_PER_MESSAGE + self.count(message.get("content") or "")
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of text that fits in max_tokens"""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is None:
+            return text[: max_tokens * self.CHARS_PER_TOKEN]
+
+        tokens = self.encoding.encode(text, disallowed_special=())
+        return self.encoding.decode(tokens[:max_tokens])
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get token count cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._counts),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class PromptBuilder:
+    """
+    Assemble chat prompts within a token budget
+    The system prompt, conversation summary and user message always go in.
+    Retrieved documents are added in rank order up to a share of what is left,
+    and history fills the rest newest-first, so the prompt never overflows and
+    spare budget is used
+    """
+
+    # Partial documents shorter than this are not worth including
+    MIN_DOCUMENT_TOKENS = 32
+
+    def __init__(
+        self,
+        counter: TokenCounter,
+        budget_tokens: int = 3000,
+        context_share: float = 0.6,
+    ):
+        self.counter = counter
+        self.budget_tokens = budget_tokens
+        self.context_share = context_share
+
+    def format_documents(
+        self, documents: list[dict[str, Any]], budget_tokens: int
+    ) -> list[str]:
+        """Numbered document entries, truncating the last one to fit"""
+        entries = []
+        remaining = budget_tokens
+
+        for i, doc in enumerate(documents, 1):
+            suffix = f" (Source: {doc.get('source', 'Unknown source')})"
+            entry = f"{i}. {doc.get('content', '')}{suffix}"
+            cost = self.counter.count(entry) + 1  # Joining newline
+
+            if cost > remaining:
+                room = remaining - self.counter.count(f"{i}. ...{suffix}") - 1
+                if room >= self.MIN_DOCUMENT_TOKENS:
+                    content = self.counter.truncate(doc.get("content", ""), room)
+                    entries.append(f"{i}. {content}...{suffix}")
+                break
+
+            entries.append(entry)
+            remaining -= cost
+
+        return entries
+
+    def build(
+        self,
+        system_prompt: str,
+        user_message: str,
+        documents: list[dict[str, Any]] | None = None,
+        history: list[dict[str, str]] | None = None,
+        summary: str | None = None,
+    ) -> tuple[list[dict[str, str]], dict[str, int]]:
+        """Return the prompt messages and how much of each input was used"""
+        if summary:
+            system_prompt += SUMMARY_HEADING + summary
+
+        user = {"role": "user", "content": user_message}
+        remaining = (
+            self.budget_tokens
+            - TOKENS_PER_REPLY
+            - self.counter.count_message(user)
+            - self.counter.count_message({"content": system_prompt})
+        )
+
+        entries = self.format_documents(
+            documents or [], int(max(remaining, 0) * self.context_share)
+        )
+        if entries:
+            context = "\n".join(entries)
+            system_prompt += CONTEXT_HEADING + context
+            # Sum the (cached) entry counts rather than re-tokenizing the join
+            remaining -= self.counter.count(CONTEXT_HEADING) + sum(
+                self.counter.count(entry) + 1 for entry in entries
+            )
+
+        kept: list[dict[str, str]] = []
+        for message in reversed(history or []):
+            cost = self.counter.count_message(message)
+            if cost > remaining:
+                break
+            kept.append(message)
+            remaining -= cost
+
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend(reversed(kept))
+        messages.append(user)
+
+        return messages, {
+            "prompt_tokens_estimate": self.budget_tokens - remaining,
+            "documents_used": len(entries),
+            "history_used": len(kept),
+        }
@@ -1,7 +1,220 @@
-﻿class RetrievalService:
-    def __init__(self):
-        pass
+﻿import asyncio
+import logging
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
 
-    async def retrieve_relevant_docs(self, query: str) -> list[str]:
-        # Implement document retrieval
-        pass
+import numpy as np
+
+from app.core.config import settings
+from app.services.ann_index import IVFPQIndex
+from app.services.embeddings import EmbeddingService
+from app.services.lexical_index import BM25Index
+from app.services.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
+
+ANN_INDEX_FILE = "ivfpq.npz"
+BM25_INDEX_DIR = "bm25"
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[tuple[int, float]]], k: int = 60
+) -> list[tuple[int, float]]:
+    """Fuse ranked (row, score) lists by summing 1 / (k + rank)"""
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, (row, _) in enumerate(ranking, 1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank)
+
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class RetrievalService:
+    """
+    Retrieve parenting resources relevant to a query
+    Backed by an in-process VectorStore and a BM25 index over the same rows;
+    hybrid search fuses both rankings
+    """
+
+    def __init__(
+        self,
+        embeddings: EmbeddingService | None = None,
+        store: VectorStore | None = None,
+        ann_index: IVFPQIndex | None = None,
+        lexical_index: BM25Index | None = None,
+    ):
+        self.embeddings = embeddings
+        self.store = store or VectorStore()
+        self.ann_index = ann_index
+        self.lexical_index = lexical_index
+        # Off once query embeddings turn out not to match the stored vectors
+        self.dense_enabled = True
+
+    @classmethod
+    def from_settings(cls, embeddings: EmbeddingService | None = None):
+        """Load the configured vector store, or start with an empty one"""
+        path = Path(settings.vector_store_path)
+
+        store = None
+        if (path / VectorStore.META_FILE).exists():
+            try:
+                store = VectorStore.load(path)
+            except Exception as e:
+                logger.error(f"Could not load vector store from {path}: {e}")
+        else:
+            logger.warning(f"No vector store at {path} - retrieval disabled")
+
+        ann_index = lexical_index = None
+        if store is not None and settings.retrieval_index_mode == "ivfpq":
+            ann_index = cls._load_ann_index(path, store)
+        if store is not None and settings.retrieval_hybrid_enabled:
+            lexical_index = cls._load_lexical_index(path, store)
+
+        service = cls(
+            embeddings=embeddings,
+            store=store,
+            ann_index=ann_index,
+            lexical_index=lexical_index,
+        )
+        if settings.embedding_dimensions:
+            service._check_dimensions(settings.embedding_dimensions)
+        return service
+
+    def _check_dimensions(self, dim: int) -> bool:
+        """Disable vector search if dim-d queries can't score the store"""
+        if self.store.dim is None or dim == self.store.dim:
+            return True
+
+        if self.dense_enabled:
+            logger.error(
+                f"Vector store has {self.store.dim}-d vectors but queries are "
+                f"{dim}-d - vector search disabled; re-ingest with the current "
+                "embedding model"
+            )
+            self.dense_enabled = False
+        return False
+
+    @staticmethod
+    def _load_ann_index(path: Path, store: VectorStore) -> IVFPQIndex | None:
+        """Load the IVF-PQ index built by scripts/ingest_docs.py"""
+        index_path = path / ANN_INDEX_FILE
+        if not index_path.exists():
+            logger.warning(f"No ANN index at {index_path} - using exact search")
+            return None
+
+        index = IVFPQIndex.load(index_path, nprobe=settings.ann_nprobe)
+        if len(index) < len(store):
+            logger.warning(
+                f"ANN index covers {len(index)} of {len(store)} vectors - rebuild it"
+            )
+
+        return index
+
+    @staticmethod
+    def _load_lexical_index(path: Path, store: VectorStore) -> BM25Index:
+        """Load the BM25 index, rebuilding it if it lags the vector store"""
+        index_path = path / BM25_INDEX_DIR
+        if index_path.exists():
+            index = BM25Index.load(index_path)
+            if len(index) == len(store):
+                return index
+            logger.warning(f"BM25 index covers {len(index)} of {len(store)} rows")
+
+        return BM25Index.build(doc.get("content", "") for doc in store.documents)
+
+    async def retrieve_relevant_docs(
+        self,
+        query: str,
+        top_k: int = 5,
+        query_embedding: list[float] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Return the top_k documents most relevant to the query"""
+        if len(self.store) == 0:
+            return []
+
+        if query_embedding is None:
+            if self.embeddings is None:
+                raise ValueError("RetrievalService needs an EmbeddingService to embed")
+            query_embedding = await self.embeddings.try_create_embedding(
+                query, timeout=settings.retrieval_embedding_timeout
+            )
+
+        return await asyncio.to_thread(
+            self.hybrid_search, query, query_embedding, top_k
+        )
+
+    def hybrid_search(
+        self, query: str, query_embedding: Sequence[float] | None, top_k: int = 5
+    ) -> list[dict[str, Any]]:
+        """
+        Fuse vector and BM25 rankings; either side may be missing.
+
+        Without an embedding this is a lexical-only search, which needs no
+        network round-trip.
+        """
+        if query_embedding is not None and not (
+            self.dense_enabled and self._check_dimensions(len(query_embedding))
+        ):
+            query_embedding = None
+
+        if self.lexical_index is None:
+            if query_embedding is None:
+                return []
+            return self.search(query_embedding, top_k)
+
+        depth = max(top_k, settings.retrieval_hybrid_candidates)
+        rankings = [self.lexical_index.search(query, depth)]
+        if query_embedding is not None:
+            rankings.append(self._search_rows([query_embedding], depth)[0])
+
+        fused = reciprocal_rank_fusion(rankings, k=settings.retrieval_rrf_k)
+        return [self._to_result(row, score) for row, score in fused[:top_k]]
+
+    async def search_relevant_content(
+        self, query: str, top_k: int = 5
+    ) -> list[dict[str, Any]]:
+        """Alias used by ParentingAgent"""
+        return await self.retrieve_relevant_docs(query, top_k=top_k)
+
+    def search(self, query_embedding: Sequence[float], top_k: int = 5):
+        """Top-k documents for an already embedded query"""
+        return self.search_batch([query_embedding], top_k)[0]
+
+    def search_batch(
+        self, query_embeddings: Sequence[Sequence[float]], top_k: int = 5
+    ) -> list[list[dict[str, Any]]]:
+        """Top-k documents for several embedded queries at once"""
+        return [
+            [self._to_result(row, score) for row, score in hits]
+            for hits in self._search_rows(query_embeddings, top_k)
+        ]
+
+    def _search_rows(
+        self, query_embeddings: Sequence[Sequence[float]], top_k: int
+    ) -> list[list[tuple[int, float]]]:
+        """Vector top-k as (row, score) pairs, via the ANN index if loaded"""
+        if self.ann_index is not None:
+            queries = VectorStore.normalize_rows(
+                np.asarray(query_embeddings, dtype=np.float32)
+            )
+            return [
+                self.ann_index.search(
+                    query,
+                    top_k,
+                    rerank_vectors=self.store.vectors,
+                    rerank_size=settings.ann_rerank_size,
+                )
+                for query in queries
+            ]
+
+        return self.store.search_batch(query_embeddings, top_k)
+
+    def _to_result(self, row: int, score: float) -> dict[str, Any]:
+        """Shape a hit the way _format_retrieved_context expects"""
+        document = self.store.documents[row]
+        return {
+            "content": document.get("content", ""),
+            "source": document.get("source", "Unknown source"),
+            "score": score,
+        }
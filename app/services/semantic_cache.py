@@ -0,0 +1,103 @@
+import logging
+import time
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    In-memory semantic response cache
+    Stores normalized question embeddings in one preallocated float32 matrix
+    and serves a prior answer when a new question is similar enough
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        threshold: float = 0.92,
+        ttl_seconds: float = 86400.0,
+    ):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+
+        # Allocated on first store, once the embedding dimension is known
+        self._matrix: np.ndarray | None = None
+        self._expires_at = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._values: list[Any] = [None] * max_entries
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray:
+        """Unit-normalize so a dot product is cosine similarity"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding: list[float]) -> Any | None:
+        """Return the cached value for the most similar question, or None"""
+        if self._size == 0:
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        scores = self._matrix[: self._size] @ self._normalize(embedding)
+        scores[self._expires_at[: self._size] < now] = -np.inf
+
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        self._last_used[best] = now
+        self.hits += 1
+        return self._values[best]
+
+    def store(self, embedding: list[float], value: Any):
+        """Cache a value, evicting the least recently used entry when full"""
+        vector = self._normalize(embedding)
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_entries, vector.shape[0]), np.float32)
+
+        if self._size < self.max_entries:
+            slot = self._size
+            self._size += 1
+        else:
+            # Expired entries have the oldest expiry; otherwise evict by LRU
+            now = time.monotonic()
+            expired = np.flatnonzero(self._expires_at < now)
+            if len(expired):
+                slot = int(expired[0])
+            else:
+                slot = int(np.argmin(self._last_used))
+            self.evictions += 1
+
+        now = time.monotonic()
+        self._matrix[slot] = vector
+        self._expires_at[slot] = now + self.ttl_seconds
+        self._last_used[slot] = now
+        self._values[slot] = value
+        self.stores += 1
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get cache hit/miss counters"""
+        lookups = self.hits + self.misses
+
+        return {
+            "size": self._size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
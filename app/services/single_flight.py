@@ -0,0 +1,51 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R")
+
+
+class SingleFlight:
+    """
+    Coalesce identical in-flight calls
+    The first caller for a key runs the call; concurrent callers with the
+    same key await that call's result instead of starting their own
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[R]]) -> R:
+        """Run fn for key, or join the call already running for key"""
+        task = self._calls.get(key)
+
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+            logger.debug(f"Joined in-flight call {key[:12]}")
+
+        # One caller disconnecting must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        """Drop a finished call so the next request starts a fresh one"""
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get coalescing counters"""
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import re
+from collections.abc import AsyncIterator
+
+from app.services.openai_client import OpenAIClient
+
+logger = logging.getLogger(__name__)
+
+# Sentence boundary: terminal punctuation or a newline followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?\n])\s+")
+
+
+class StreamModerator:
+    """
+    Incremental output moderation for streamed responses
+    Moderates completed sentences in overlapping windows while generation
+    continues, so only the final window is checked after the stream ends
+    """
+
+    def __init__(
+        self,
+        openai_client: OpenAIClient,
+        lookahead_chars: int = 32,
+        min_window_chars: int = 160,
+    ):
+        self.openai_client = openai_client
+        self.lookahead_chars = lookahead_chars
+        self.min_window_chars = min_window_chars
+
+        self.flagged = False
+        self.windows_checked = 0
+
+        self._tasks: list[asyncio.Task] = []
+        self._previous_sentence = ""
+
+    async def moderate(self, deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+        """
+        Pass through streamed text while moderating it in windows.
+
+        Text is released as it arrives except for a small look-ahead buffer.
+        Stops early and sets `flagged` if any window is flagged; the caller
+        is then responsible for retracting what has already been released.
+        """
+        pending = ""  # Received but not yet released
+        sentence_buffer = ""  # Text not yet submitted for moderation
+
+        try:
+            async for delta in deltas:
+                pending += delta
+                sentence_buffer += delta
+
+                sentence_buffer = self._submit_completed(sentence_buffer)
+
+                if self._check_finished():
+                    return
+
+                if len(pending) > self.lookahead_chars:
+                    release = pending[: -self.lookahead_chars]
+                    pending = pending[-self.lookahead_chars :]
+                    yield release
+
+            # Moderate whatever is left, then wait for outstanding windows
+            if sentence_buffer.strip():
+                self._submit_window(sentence_buffer)
+
+            await asyncio.gather(*self._tasks)
+            if self._check_finished():
+                return
+
+            if pending:
+                yield pending
+
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    def _submit_completed(self, sentence_buffer: str) -> str:
+        """Submit completed sentences for moderation, returning the remainder"""
+        parts = SENTENCE_BOUNDARY.split(sentence_buffer)
+        if len(parts) == 1:
+            return sentence_buffer
+
+        completed, remainder = " ".join(parts[:-1]), parts[-1]
+        if len(completed) < self.min_window_chars:
+            # Keep accumulating until the window is worth a round-trip
+            return sentence_buffer
+
+        self._submit_window(completed)
+        return remainder
+
+    def _submit_window(self, text: str):
+        """Moderate a window, overlapping with the previous one for context"""
+        window = f"{self._previous_sentence} {text}".strip()
+        self._previous_sentence = SENTENCE_BOUNDARY.split(text.strip())[-1]
+
+        self.windows_checked += 1
+        self._tasks.append(asyncio.create_task(self._moderate_window(window)))
+
+    async def _moderate_window(self, window: str) -> bool:
+        """Moderate a single window"""
+        try:
+            moderation = await self.openai_client.moderate_content(window)
+            return moderation.flagged
+
+        except Exception as e:
+            logger.warning(f"Windowed output moderation failed: {e}")
+            # Fail open, same as full-response output moderation
+            return False
+
+    def _check_finished(self) -> bool:
+        """Record a flag from any finished window"""
+        for task in self._tasks:
+            if task.done() and not task.cancelled() and task.result():
+                self.flagged = True
+                return True
+
+        return False
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import crud
+from app.services.cost_tracker import CostTracker
+from app.services.openai_client import OpenAIClient
+
+logger = logging.getLogger(__name__)
+
+FOLD_PROMPT = """
+    You maintain a running summary of a conversation between a parent and a
+    parenting assistant. Update the summary with the new messages below.
+    Keep durable facts: the children's names and ages, health conditions,
+    family situation, the parent's concerns and goals, and advice already
+    given. Drop small talk. Write plain prose, at most {max_words} words.
+    """
+
+
+class ConversationSummarizer:
+    """
+    Background rolling summaries of long conversations
+    Messages that fall out of the recent-history window are folded into the
+    conversation's stored summary a batch at a time, so each update is one
+    short LLM call over the previous summary and the new messages, and the
+    history sent with each turn stays bounded
+    """
+
+    model = "gpt-4o-mini"
+
+    def __init__(
+        self,
+        openai_client: OpenAIClient,
+        session_factory: Callable[[], AsyncSession],
+        cost_tracker: CostTracker | None = None,
+        history_window: int = 8,
+        fold_batch: int = 6,
+        max_tokens: int = 300,
+        on_fold: Callable[[int, str, int], None] | None = None,
+        read_session_factory: Callable[[], AsyncSession] | None = None,
+    ):
+        self.openai_client = openai_client
+        self.session_factory = session_factory
+        self.read_session_factory = read_session_factory or session_factory
+        self.cost_tracker = cost_tracker
+        self.history_window = history_window
+        self.fold_batch = fold_batch
+        self.max_tokens = max_tokens
+        self.on_fold = on_fold
+
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._rerun: set[int] = set()
+
+        self.folds = 0
+        self.messages_folded = 0
+        self.failures = 0
+
+    def schedule(self, conversation_id: int):
+        """Fold the conversation's old messages in the background"""
+        if conversation_id in self._tasks:
+            # Look again once the running fold finishes
+            self._rerun.add(conversation_id)
+            return
+
+        task = asyncio.create_task(self._run(conversation_id))
+        self._tasks[conversation_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(conversation_id, None))
+
+    async def _run(self, conversation_id: int):
+        """Fold until nothing old enough is left, one fold at a time"""
+        try:
+            while await self.summarize(conversation_id) or (
+                conversation_id in self._rerun
+            ):
+                self._rerun.discard(conversation_id)
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Summarizing conversation {conversation_id} failed: {e}")
+        finally:
+            self._rerun.discard(conversation_id)
+
+    async def summarize(self, conversation_id: int) -> bool:
+        """Fold one batch of messages into the summary; False if none is due"""
+        # No session is held during the LLM call: on production SQLite the
+        # writer is a single connection shared by every write in the app
+        async with self.read_session_factory() as db:
+            conversation = await crud.get_conversation(db, conversation_id)
+            if conversation is None:
+                return False
+
+            # Fold the oldest batch once a full window of newer messages exists
+            pending = await crud.get_messages_after(
+                db,
+                conversation_id,
+                conversation.summarized_message_id,
+                limit=self.fold_batch + self.history_window,
+            )
+            if len(pending) < self.fold_batch + self.history_window:
+                return False
+
+        old = pending[: self.fold_batch]
+        summary = await self._fold(conversation.summary, old)
+
+        async with self.session_factory() as db:
+            stored = await crud.update_conversation_summary(
+                db, conversation_id, summary, old[-1].id
+            )
+
+        if stored and self.on_fold is not None:
+            self.on_fold(conversation_id, summary, len(old))
+
+        self.folds += 1
+        self.messages_folded += len(old)
+        logger.info(
+            f"Folded {len(old)} messages into conversation {conversation_id} summary"
+        )
+        return True
+
+    async def _fold(self, summary: str | None, messages: list) -> str:
+        """Ask the model for the previous summary updated with the messages"""
+        transcript = "\n".join(f"{m.role}: {m.content}" for m in messages)
+        prompt = (
+            f"Summary so far:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"
+        )
+
+        response = await self.openai_client.chat_completion(
+            messages=[
+                {
+                    "role": "system",
+                    "content": FOLD_PROMPT.format(max_words=self.max_tokens * 3 // 4),
+                },
+                {"role": "user", "content": prompt},
+            ],
+            model=self.model,
+            max_tokens=self.max_tokens,
+            temperature=0.2,
+        )
+
+        if self.cost_tracker is not None:
+            await self.cost_tracker.track_chat_completion(
+                response.usage.prompt_tokens,
+                response.usage.completion_tokens,
+                self.model,
+            )
+
+        return response.choices[0].message.content.strip()
+
+    async def aclose(self):
+        """Stop in-flight folds; they are redone on the next turn"""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get summarizer counters"""
+        return {
+            "folds": self.folds,
+            "messages_folded": self.messages_folded,
+            "failures": self.failures,
+            "in_flight": len(self._tasks),
+        }
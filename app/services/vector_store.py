@@ -0,0 +1,509 @@
+import json
+import logging
+import os
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Storage formats for persisted vectors; int8 keeps a float32 scale per row
+STORAGE_DTYPES = ("float32", "float16", "int8")
+
+# Bound on the float32 scratch block used when scoring stored vectors.
+# float32 rows are scored in place; int8 and especially float16 rows are
+# widened block by block on every query, trading latency for size
+SCORE_BLOCK_BYTES = 16 * 1024 * 1024
+
+# Rows copied at a time when compacting a store
+COMPACT_BLOCK_ROWS = 65536
+
+
+def quantize_int8(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization; returns (codes, scales)"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class Int8Rows:
+    """
+    Read-only view of int8-quantized rows that dequantizes on indexing
+    Supports the slicing and fancy indexing the ANN index and re-ranking use
+    """
+
+    def __init__(self, codes: np.ndarray, scales: np.ndarray):
+        self.codes = codes
+        self.scales = scales
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.codes.shape
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, key) -> np.ndarray:
+        rows = self.codes[key].astype(np.float32)
+        rows *= self.scales[key][..., None]
+        return rows
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        rows = self[:]
+        return rows if dtype is None else rows.astype(dtype, copy=False)
+
+
+def _memmap(path: Path, dtype, shape: tuple[int, ...]) -> np.ndarray:
+    """Read-only memory map; numpy cannot map zero bytes"""
+    if 0 in shape:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+class DocumentBlob(Sequence):
+    """
+    Documents stored as concatenated JSON in one flat byte blob
+    An array of end offsets locates each document, so a lookup decodes only
+    the rows a search returns and nothing is parsed at load time
+    """
+
+    def __init__(self, blob: np.ndarray, ends: np.ndarray):
+        self.blob = blob
+        self.ends = ends
+
+    @classmethod
+    def open(cls, path: Path, count: int) -> "DocumentBlob":
+        """Memory-map the committed documents of a store directory"""
+        ends = _memmap(path / VectorStore.OFFSETS_FILE, np.uint64, (count,))
+        size = int(ends[-1]) if count else 0
+        return cls(_memmap(path / VectorStore.DOCUMENTS_FILE, np.uint8, (size,)), ends)
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("document index out of range")
+
+        start = int(self.ends[index - 1]) if index else 0
+        return json.loads(self.blob[start : int(self.ends[index])].tobytes())
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+class VectorStore:
+    """
+    In-process vector index for retrieval
+    Embeddings are unit-normalized rows of one matrix, so cosine top-k is a
+    matrix-vector product. A loaded store memory-maps its (optionally
+    quantized) files read-only, so worker processes share one page-cache
+    copy and startup does not depend on corpus size.
+    """
+
+    META_FILE = "meta.json"
+    VECTORS_FILE = "vectors.bin"
+    SCALES_FILE = "scales.f32"
+    DOCUMENTS_FILE = "documents.bin"
+    OFFSETS_FILE = "offsets.u64"
+
+    def __init__(self, dim: int | None = None, initial_capacity: int = 1024):
+        self.dim = dim
+        self.documents: Sequence[dict[str, Any]] = []
+        self.read_only = False
+
+        self._matrix = np.zeros((initial_capacity, dim or 0), dtype=np.float32)
+        self._scales: np.ndarray | None = None  # int8 storage only
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray | Int8Rows:
+        """View of the stored (normalized) vectors"""
+        if self._scales is not None:
+            return Int8Rows(self._matrix[: self._size], self._scales[: self._size])
+        return self._matrix[: self._size]
+
+    @staticmethod
+    def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """Unit-normalize rows so dot products are cosine similarities"""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def add(
+        self,
+        embeddings: Sequence[Sequence[float]] | np.ndarray,
+        documents: list[dict[str, Any]],
+    ):
+        """Append embeddings and their documents ({"content", "source", ...})"""
+        if self.read_only:
+            raise ValueError("Loaded stores are read-only; use VectorStoreWriter")
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(documents):
+            raise ValueError("Expected one embedding per document")
+
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._matrix = np.zeros((len(self._matrix), self.dim), np.float32)
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Expected {self.dim}-d embeddings, got {vectors.shape[1]}"
+            )
+
+        self._reserve(self._size + len(vectors))
+        self._matrix[self._size : self._size + len(vectors)] = self.normalize_rows(
+            vectors
+        )
+        self._size += len(vectors)
+        self.documents.extend(documents)
+
+    def _reserve(self, capacity: int):
+        """Grow the matrix geometrically so appends stay amortized O(1)"""
+        if capacity <= len(self._matrix):
+            return
+
+        new_capacity = max(capacity, len(self._matrix) * 2)
+        matrix = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        matrix[: self._size] = self._matrix[: self._size]
+        self._matrix = matrix
+
+    def _block(self, start: int, stop: int) -> np.ndarray:
+        """Rows start:stop as float32, dequantizing if needed"""
+        block = np.asarray(self._matrix[start:stop], dtype=np.float32)
+        if self._scales is not None:
+            block *= self._scales[start:stop, None]
+        return block
+
+    def _score_block(
+        self, query_matrix: np.ndarray, start: int, stop: int, scratch: np.ndarray
+    ) -> np.ndarray:
+        """Scores of rows start:stop against every query"""
+        rows = self._matrix[start:stop]
+        if rows.dtype == np.float32:
+            return query_matrix @ rows.T
+
+        # Widen into the reused scratch block: BLAS needs float32 operands,
+        # and a fresh allocation per block costs as much as the conversion
+        block = scratch[: stop - start]
+        np.copyto(block, rows, casting="unsafe")
+        scores = query_matrix @ block.T
+        if self._scales is not None:
+            # Per-row scales commute with the dot product
+            scores *= self._scales[start:stop]
+        return scores
+
+    def search(self, query: Sequence[float], top_k: int = 5) -> list[tuple[int, float]]:
+        """Return (row, cosine score) pairs for the top_k nearest rows"""
+        return self.search_batch([query], top_k)[0]
+
+    def search_batch(
+        self, queries: Sequence[Sequence[float]] | np.ndarray, top_k: int = 5
+    ) -> list[list[tuple[int, float]]]:
+        """Top-k search for several queries, scoring the rows in blocks"""
+        if self._size == 0:
+            return [[] for _ in range(len(queries))]
+
+        query_matrix = self.normalize_rows(np.asarray(queries, dtype=np.float32))
+        k = min(top_k, self._size)
+
+        # Keep the best k of each block, so scratch memory stays bounded
+        # however large the (memory-mapped) store is
+        block_rows = max(k, SCORE_BLOCK_BYTES // (4 * self.dim))
+        scratch = np.empty((min(block_rows, self._size), self.dim), np.float32)
+        candidate_rows, candidate_scores = [], []
+
+        for start in range(0, self._size, block_rows):
+            stop = min(start + block_rows, self._size)
+            # (queries, block rows)
+            scores = self._score_block(query_matrix, start, stop, scratch)
+
+            kb = min(k, stop - start)
+            # argpartition is O(n); only the k winners are sorted
+            top = np.argpartition(-scores, kb - 1, axis=1)[:, :kb]
+            candidate_rows.append(top + start)
+            candidate_scores.append(np.take_along_axis(scores, top, axis=1))
+
+        rows = np.concatenate(candidate_rows, axis=1)
+        scores = np.concatenate(candidate_scores, axis=1)
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+
+        rows = np.take_along_axis(np.take_along_axis(rows, top, axis=1), order, axis=1)
+        row_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return [
+            [(int(r), float(s)) for r, s in zip(rs, ss, strict=True)]
+            for rs, ss in zip(rows, row_scores, strict=True)
+        ]
+
+    def save(self, path: str | Path, dtype: str = "float32"):
+        """Persist vectors and documents, replacing a directory's contents"""
+        path = Path(path)
+        for name in (
+            self.META_FILE,
+            self.VECTORS_FILE,
+            self.SCALES_FILE,
+            self.DOCUMENTS_FILE,
+            self.OFFSETS_FILE,
+        ):
+            (path / name).unlink(missing_ok=True)
+
+        with VectorStoreWriter(path, dim=self.dim, dtype=dtype) as writer:
+            writer.append(self._block(0, self._size), list(self.documents))
+
+        logger.info(f"Saved {self._size} vectors to {path}")
+
+    @classmethod
+    def load(cls, path: str | Path) -> "VectorStore":
+        """Memory-map the committed contents of a store directory"""
+        path = Path(path)
+        meta = read_meta(path)
+        count, dim, dtype = meta["count"], meta["dim"], meta["dtype"]
+
+        store = cls(dim=dim, initial_capacity=0)
+        store._matrix = _memmap(path / cls.VECTORS_FILE, dtype, (count, dim))
+        if dtype == "int8":
+            store._scales = _memmap(path / cls.SCALES_FILE, np.float32, (count,))
+        store.documents = DocumentBlob.open(path, count)
+        store._size = count
+        store.read_only = True
+
+        logger.info(f"Mapped {count} {dtype} vectors from {path}")
+        return store
+
+
+def read_meta(path: Path) -> dict[str, Any]:
+    """Read a store's metadata; count is the number of committed rows"""
+    with open(path / VectorStore.META_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class VectorStoreWriter:
+    """
+    Append-only writer for an on-disk vector store
+    Rows are appended to flat vector, scale, document and offset files, then
+    committed by atomically rewriting meta.json. Anything written after the
+    last commit (e.g. by a crashed run) is truncated when the writer opens.
+    compact() rewrites the files without dropped rows; an interrupted
+    compaction is finished or discarded when the writer opens.
+    """
+
+    COMPACT_SUFFIX = ".compact"
+
+    DATA_FILES = (
+        VectorStore.VECTORS_FILE,
+        VectorStore.SCALES_FILE,
+        VectorStore.DOCUMENTS_FILE,
+        VectorStore.OFFSETS_FILE,
+    )
+
+    def __init__(
+        self, path: str | Path, dim: int | None = None, dtype: str | None = None
+    ):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._recover_compaction()
+
+        if (self.path / VectorStore.META_FILE).exists():
+            meta = read_meta(self.path)
+            self.count, self.dim, self.dtype = meta["count"], meta["dim"], meta["dtype"]
+            if dim is not None and dim != self.dim:
+                raise ValueError(f"Store has {self.dim}-d vectors, not {dim}-d")
+            if dtype is not None and dtype != self.dtype:
+                logger.warning(f"Store is {self.dtype}; appending {self.dtype} rows")
+        else:
+            dtype = dtype or "float32"
+            if dtype not in STORAGE_DTYPES:
+                raise ValueError(f"Storage dtype must be one of {STORAGE_DTYPES}")
+            self.count, self.dim, self.dtype = 0, dim, dtype
+
+        self._truncate_uncommitted()
+        self._open()
+
+    def _open(self):
+        self._files = {name: open(self.path / name, "ab") for name in self.DATA_FILES}
+        self._blob_size = os.path.getsize(self.path / VectorStore.DOCUMENTS_FILE)
+
+    def _truncate_uncommitted(self):
+        """Drop rows past the committed count"""
+        for name in self.DATA_FILES:
+            (self.path / name).touch()
+
+        ends = np.fromfile(
+            self.path / VectorStore.OFFSETS_FILE, dtype=np.uint64, count=self.count
+        )
+        row_bytes = (self.dim or 0) * np.dtype(self.dtype).itemsize
+        sizes = {
+            VectorStore.VECTORS_FILE: self.count * row_bytes,
+            VectorStore.SCALES_FILE: self.count * 4 if self.dtype == "int8" else 0,
+            VectorStore.DOCUMENTS_FILE: int(ends[-1]) if self.count else 0,
+            VectorStore.OFFSETS_FILE: self.count * 8,
+        }
+
+        for name, size in sizes.items():
+            with open(self.path / name, "r+b") as f:
+                f.truncate(size)
+
+    def existing_hashes(self) -> set[str]:
+        """Content hashes of every committed document"""
+        return {doc.get("hash") for doc in DocumentBlob.open(self.path, self.count)}
+
+    def append(
+        self,
+        embeddings: Sequence[Sequence[float]] | np.ndarray,
+        documents: list[dict[str, Any]],
+    ):
+        """Durably append normalized embeddings and their documents"""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if len(vectors) != len(documents):
+            raise ValueError("Expected one embedding per document")
+        if len(vectors) == 0:
+            return
+
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Expected {self.dim}-d embeddings, got {vectors.shape[1]}"
+            )
+
+        vectors = VectorStore.normalize_rows(vectors)
+        if self.dtype == "int8":
+            codes, scales = quantize_int8(vectors)
+            self._files[VectorStore.VECTORS_FILE].write(codes.tobytes())
+            self._files[VectorStore.SCALES_FILE].write(scales.tobytes())
+        else:
+            self._files[VectorStore.VECTORS_FILE].write(
+                vectors.astype(self.dtype).tobytes()
+            )
+
+        encoded = [json.dumps(doc).encode("utf-8") for doc in documents]
+        ends = self._blob_size + np.cumsum([len(e) for e in encoded], dtype=np.uint64)
+        self._files[VectorStore.DOCUMENTS_FILE].write(b"".join(encoded))
+        self._files[VectorStore.OFFSETS_FILE].write(ends.tobytes())
+        self._blob_size = int(ends[-1])
+
+        for f in self._files.values():
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.count += len(vectors)
+        self._commit()
+
+    def _commit(self):
+        """Atomically publish the new row count"""
+        tmp = self.path / (VectorStore.META_FILE + ".tmp")
+        self._write_meta(tmp, self.count)
+        os.replace(tmp, self.path / VectorStore.META_FILE)
+
+    def _write_meta(self, path: Path, count: int):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"count": count, "dim": self.dim, "dtype": self.dtype}, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compact(self, hashes: set[str]) -> int:
+        """
+        Keep one row per content hash in hashes and drop every other row;
+        returns the number of rows dropped
+        """
+        rows, kept = [], set()
+        for i, doc in enumerate(DocumentBlob.open(self.path, self.count)):
+            if doc.get("hash") in hashes and doc.get("hash") not in kept:
+                kept.add(doc["hash"])
+                rows.append(i)
+
+        dropped = self.count - len(rows)
+        if dropped == 0:
+            return 0
+
+        # Write the surviving rows beside the live files, then swap them in
+        self.close()
+        shape = (self.count, self.dim)
+        vectors = _memmap(self.path / VectorStore.VECTORS_FILE, self.dtype, shape)
+        scales = _memmap(
+            self.path / VectorStore.SCALES_FILE,
+            np.float32,
+            (self.count if self.dtype == "int8" else 0,),
+        )
+        documents = DocumentBlob.open(self.path, self.count)
+
+        out = {
+            name: open(self.path / (name + self.COMPACT_SUFFIX), "wb")
+            for name in self.DATA_FILES
+        }
+        blob_size = 0
+        for start in range(0, len(rows), COMPACT_BLOCK_ROWS):
+            block = np.asarray(rows[start : start + COMPACT_BLOCK_ROWS])
+            out[VectorStore.VECTORS_FILE].write(vectors[block].tobytes())
+            if self.dtype == "int8":
+                out[VectorStore.SCALES_FILE].write(scales[block].tobytes())
+
+            starts = [int(documents.ends[i - 1]) if i else 0 for i in block]
+            encoded = [
+                documents.blob[s : int(documents.ends[i])].tobytes()
+                for s, i in zip(starts, block, strict=True)
+            ]
+            ends = blob_size + np.cumsum([len(e) for e in encoded], dtype=np.uint64)
+            out[VectorStore.DOCUMENTS_FILE].write(b"".join(encoded))
+            out[VectorStore.OFFSETS_FILE].write(ends.tobytes())
+            blob_size = int(ends[-1])
+
+        for f in out.values():
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        del vectors, scales, documents
+
+        # The compacted meta marks the new files complete: from here on an
+        # interrupted swap is finished rather than discarded
+        self._write_meta(
+            self.path / (VectorStore.META_FILE + self.COMPACT_SUFFIX), len(rows)
+        )
+        self._recover_compaction()
+
+        self.count = len(rows)
+        self._open()
+        logger.info(f"Compacted {self.path}: dropped {dropped} rows")
+        return dropped
+
+    def _recover_compaction(self):
+        """Finish a compaction whose files are complete, else discard it"""
+        meta = self.path / (VectorStore.META_FILE + self.COMPACT_SUFFIX)
+        complete = meta.exists()
+
+        for name in self.DATA_FILES:
+            compacted = self.path / (name + self.COMPACT_SUFFIX)
+            if compacted.exists():
+                if complete:
+                    os.replace(compacted, self.path / name)
+                else:
+                    compacted.unlink()
+
+        if complete:
+            os.replace(meta, self.path / VectorStore.META_FILE)
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+
+    def __enter__(self) -> "VectorStoreWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark approximate (IVF-PQ) retrieval against exact search.
+
+Reports recall@k and per-query latency for a range of nprobe values, with
+and without exact re-ranking. Uses the configured vector store and its ANN
+index, or a synthetic clustered corpus with --synthetic.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the parent directory to the Python path
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from app.core.config import settings  # noqa: E402
+from app.services.ann_index import IVFPQIndex  # noqa: E402
+from app.services.retrieval import ANN_INDEX_FILE  # noqa: E402
+from app.services.vector_store import VectorStore  # noqa: E402
+
+
+def synthetic_corpus(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(n // 200, 1), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)]
+    vectors += 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return VectorStore.normalize_rows(vectors)
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    """Perturbed corpus rows, so every query has true near neighbours"""
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.integers(0, len(vectors), count)].astype(np.float32)
+    queries += 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+    return VectorStore.normalize_rows(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--synthetic", type=int, metavar="N", help="corpus size")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument(
+        "--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64]
+    )
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors = synthetic_corpus(args.synthetic, args.dim)
+        print(f"Building IVF-PQ over {len(vectors)} synthetic vectors...")
+        index = IVFPQIndex.build(
+            vectors,
+            n_lists=settings.ann_n_lists,
+            n_subvectors=settings.ann_n_subvectors,
+        )
+    else:
+        store_path = Path(settings.vector_store_path)
+        # Dequantized into RAM: the exact baseline scans every row
+        vectors = np.asarray(VectorStore.load(store_path).vectors, dtype=np.float32)
+        index = IVFPQIndex.load(store_path / ANN_INDEX_FILE)
+
+    queries = make_queries(vectors, args.queries)
+    k = args.top_k
+
+    # Exact baseline
+    start = time.perf_counter()
+    exact = []
+    for query in queries:
+        scores = vectors @ query
+        exact.append(set(np.argpartition(-scores, k - 1)[:k].tolist()))
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    print(f"\n{len(vectors)} vectors, {vectors.shape[1]} dims, recall@{k}")
+    print(f"exact search: {exact_ms:.3f} ms/query\n")
+    print(f"{'nprobe':>6} {'rerank':>6} {'recall':>7} {'ms/query':>9} {'p95 ms':>7}")
+
+    for nprobe in args.nprobe:
+        for rerank in (False, True):
+            latencies = []
+            recall = 0.0
+
+            for query, truth in zip(queries, exact, strict=True):
+                start = time.perf_counter()
+                hits = index.search(
+                    query,
+                    k,
+                    nprobe=nprobe,
+                    rerank_vectors=vectors if rerank else None,
+                    rerank_size=settings.ann_rerank_size,
+                )
+                latencies.append((time.perf_counter() - start) * 1000)
+                recall += len({row for row, _ in hits} & truth) / k
+
+            print(
+                f"{nprobe:>6} {'yes' if rerank else 'no':>6} "
+                f"{recall / len(queries):>7.3f} {np.mean(latencies):>9.3f} "
+                f"{np.percentile(latencies, 95):>7.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
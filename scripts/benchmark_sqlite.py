@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent reads and writes on SQLite with and without production
+mode (WAL, one writer connection, read-only connection pool).
+
+Writer processes insert message batches the way the write-behind queue
+does, while reader processes load conversation history pages. Each mode
+runs against a fresh temporary database file.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Add the parent directory to the Python path
+backend_root = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_root))
+
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker  # noqa: E402
+
+from app.db import crud, models  # noqa: E402
+from app.db.session import create_engines  # noqa: E402
+
+
+async def seed(session_factory, conversations: int, messages: int):
+    """One user with conversations sharing the seed messages evenly"""
+    now = datetime.utcnow()
+    async with session_factory() as db:
+        await db.execute(insert(models.User), [{"email": "bench@example.com"}])
+        await db.execute(
+            insert(models.Conversation),
+            [
+                {"user_id": 1, "title": f"Conversation {i}", "last_message_at": now}
+                for i in range(conversations)
+            ],
+        )
+        await crud.create_messages(
+            db,
+            [
+                {
+                    "conversation_id": i % conversations + 1,
+                    "role": "user" if i % 2 else "assistant",
+                    "content": f"Seed message {i} " + "x" * 200,
+                    "created_at": now,
+                }
+                for i in range(messages)
+            ],
+        )
+
+
+async def writer(session_factory, args, deadline: float, stats: dict):
+    while time.time() < deadline:
+        conversation_id = random.randint(1, args.conversations)
+        rows = [
+            {
+                "conversation_id": conversation_id,
+                "role": "user",
+                "content": "Benchmark message " + "x" * 200,
+                "created_at": datetime.utcnow(),
+            }
+            for _ in range(args.batch)
+        ]
+
+        start = time.perf_counter()
+        try:
+            async with session_factory() as db:
+                await crud.create_messages(db, rows)
+            stats["ms"].append((time.perf_counter() - start) * 1000)
+        except Exception:
+            stats["errors"] += 1
+
+
+async def reader(session_factory, args, deadline: float, stats: dict):
+    while time.time() < deadline:
+        conversation_id = random.randint(1, args.conversations)
+
+        start = time.perf_counter()
+        try:
+            async with session_factory() as db:
+                await crud.get_conversation_messages(db, conversation_id, limit=50)
+            stats["ms"].append((time.perf_counter() - start) * 1000)
+        except Exception:
+            stats["errors"] += 1
+
+
+async def _work(kind: str, url: str, production: bool, args, deadline: float):
+    write_engine, read_engine = create_engines(
+        make_url(url), sqlite_production=production
+    )
+    stats = {"ms": [], "errors": 0}
+    if kind == "write":
+        sessions = async_sessionmaker(write_engine, expire_on_commit=False)
+        await writer(sessions, args, deadline, stats)
+    else:
+        sessions = async_sessionmaker(read_engine, expire_on_commit=False)
+        await reader(sessions, args, deadline, stats)
+
+    await write_engine.dispose()
+    await read_engine.dispose()
+    return kind, stats
+
+
+def work(kind: str, url: str, production: bool, args, deadline: float):
+    """One reader or writer process, like a single API worker"""
+    random.seed()
+    return asyncio.run(_work(kind, url, production, args, deadline))
+
+
+async def prepare(url: str, production: bool, args):
+    write_engine, read_engine = create_engines(
+        make_url(url), sqlite_production=production
+    )
+    async with write_engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    await seed(
+        async_sessionmaker(write_engine, expire_on_commit=False),
+        args.conversations,
+        args.seed_messages,
+    )
+    await write_engine.dispose()
+    await read_engine.dispose()
+
+
+def run(args, production: bool) -> dict:
+    """Run the workload against a new database file in one mode"""
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        url = f"sqlite+aiosqlite:///{tmp}/benchmark.db"
+        asyncio.run(prepare(url, production, args))
+
+        # Processes rather than tasks: contention is then on SQLite's locks,
+        # not on one event loop
+        kinds = ["write"] * args.writers + ["read"] * args.readers
+        deadline = time.time() + 1.0 + args.seconds
+        with multiprocessing.Pool(len(kinds)) as pool:
+            results = pool.starmap(
+                work, [(kind, url, production, args, deadline) for kind in kinds]
+            )
+
+        stats = {}
+        for kind, result in results:
+            totals = stats.setdefault(kind, {"ms": [], "errors": 0})
+            totals["ms"] += result["ms"]
+            totals["errors"] += result["errors"]
+        return stats
+
+
+def summarize(name: str, stats: dict, seconds: float):
+    for kind in ("write", "read"):
+        latencies = stats.get(kind, {}).get("ms") or [0.0]
+        done = len(stats.get(kind, {}).get("ms", []))
+        print(
+            f"{name:>10} {kind:>5} {done / seconds:>9.1f} "
+            f"{np.percentile(latencies, 50):>7.2f} {np.percentile(latencies, 99):>8.2f} "
+            f"{stats.get(kind, {}).get('errors', 0):>6}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=20, help="messages per write")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--seed-messages", type=int, default=20_000)
+    parser.add_argument("--dir", help="where to create the database files")
+    args = parser.parse_args()
+
+    print(
+        f"{args.writers} writers x {args.batch} messages, {args.readers} readers, "
+        f"{args.seconds:.0f}s per mode\n"
+    )
+    print(
+        f"{'mode':>10} {'op':>5} {'ops/s':>9} {'p50 ms':>7} {'p99 ms':>8} {'errors':>6}"
+    )
+
+    for name, production in (("default", False), ("production", True)):
+        summarize(name, run(args, production), args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 from app.db.models import Base
@@ -7,14 +8,17 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def create_tables():
+async def create_tables():
     """Create all database tables"""
     try:
-        Base.metadata.create_all(bind=engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating tables: {str(e)}")
+    finally:
+        await engine.dispose()
 
 
 if __name__ == "__main__":
-    create_tables()
+    asyncio.run(create_tables())
@@ -0,0 +1,23 @@
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db import models
+
+
+@pytest.fixture
+def open_db(tmp_path):
+    """Opens a fresh SQLite database with every table, inside a running loop"""
+
+    @asynccontextmanager
+    async def open_db():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+        try:
+            yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        finally:
+            await engine.dispose()
+
+    return open_db
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from app.services.ann_index import IVFPQIndex
+from app.services.vector_store import VectorStore, VectorStoreWriter
+
+
+@pytest.fixture(scope="module")
+def corpus() -> tuple[np.ndarray, np.ndarray]:
+    """Clustered unit vectors, like embeddings of related documents"""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(40, 32))
+    vectors = centers[rng.integers(0, 40, 4000)] + 0.4 * rng.normal(size=(4000, 32))
+    queries = vectors[rng.choice(4000, 50, replace=False)] + 0.1 * rng.normal(
+        size=(50, 32)
+    )
+    return (
+        VectorStore.normalize_rows(vectors.astype(np.float32)),
+        VectorStore.normalize_rows(queries.astype(np.float32)),
+    )
+
+
+@pytest.fixture(scope="module")
+def index(corpus) -> IVFPQIndex:
+    return IVFPQIndex.build(corpus[0], n_lists=64, n_subvectors=16)
+
+
+def _recall(index, vectors, queries, top_k=10, **search_args) -> float:
+    found = 0
+    for query in queries:
+        exact = set(np.argsort(-(vectors @ query))[:top_k])
+        approximate = {i for i, _ in index.search(query, top_k=top_k, **search_args)}
+        found += len(exact & approximate)
+    return found / (top_k * len(queries))
+
+
+def test_recall_improves_with_nprobe(corpus, index):
+    vectors, queries = corpus
+
+    narrow = _recall(index, vectors, queries, nprobe=1)
+    wide = _recall(index, vectors, queries, nprobe=16)
+    assert wide > narrow
+    assert wide >= 0.75
+
+
+def test_rerank_against_stored_vectors_restores_recall(corpus, index, tmp_path):
+    vectors, queries = corpus
+
+    with VectorStoreWriter(tmp_path, dtype="int8") as writer:
+        writer.append(vectors, [{"content": str(i)} for i in range(len(vectors))])
+    store = VectorStore.load(tmp_path)
+
+    recall = _recall(index, vectors, queries, nprobe=16, rerank_vectors=store.vectors)
+    assert recall >= 0.95
+
+    # Reranked scores are exact inner products, best first
+    query = queries[0]
+    results = index.search(query, top_k=5, nprobe=16, rerank_vectors=store.vectors)
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+    np.testing.assert_allclose(
+        scores, vectors[[i for i, _ in results]] @ query, atol=0.02
+    )
+
+
+def test_save_and_load_preserve_results(corpus, tmp_path):
+    vectors, queries = corpus
+    index = IVFPQIndex.build(vectors, n_lists=32, n_subvectors=8, nprobe=4)
+    index.save(tmp_path / "ann.npz")
+
+    loaded = IVFPQIndex.load(tmp_path / "ann.npz")
+    assert len(loaded) == len(vectors)
+    assert loaded.nprobe == 4
+    assert loaded.search(queries[0], top_k=10) == index.search(queries[0], top_k=10)
+
+
+def test_build_adapts_parameters_to_small_corpora():
+    vectors = VectorStore.normalize_rows(
+        np.random.default_rng(1).normal(size=(100, 30)).astype(np.float32)
+    )
+    index = IVFPQIndex.build(vectors, n_lists=1024, n_subvectors=8)
+
+    assert index.n_lists == 100 // 39
+    assert 30 % index.n_subvectors == 0
+    assert len(index.search(vectors[0], top_k=3, nprobe=index.n_lists)) == 3
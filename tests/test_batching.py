@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from app.services.batching import MicroBatcher
+
+
+def test_concurrent_submits_share_one_batch():
+    calls = []
+
+    async def handler(items):
+        calls.append(items)
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(handler, max_batch_size=10, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        await batcher.aclose()
+        return results
+
+    assert asyncio.run(run()) == [0, 2, 4, 6, 8]
+    assert calls == [[0, 1, 2, 3, 4]]
+
+
+def test_identical_items_are_sent_once():
+    calls = []
+
+    async def handler(items):
+        calls.append(items)
+        return [item.upper() for item in items]
+
+    async def run():
+        batcher = MicroBatcher(handler, max_wait_ms=20)
+        return await asyncio.gather(
+            batcher.submit("a"), batcher.submit("b"), batcher.submit("a")
+        )
+
+    assert asyncio.run(run()) == ["A", "B", "A"]
+    assert calls == [["a", "b"]]
+
+
+def test_full_batch_is_sent_without_waiting():
+    calls = []
+
+    async def handler(items):
+        calls.append(items)
+        return items
+
+    async def run():
+        # A wait this long would time the test out if the size limit failed
+        batcher = MicroBatcher(handler, max_batch_size=3, max_wait_ms=60_000)
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(6))), timeout=1
+        )
+        return results, batcher.get_stats()
+
+    results, stats = asyncio.run(run())
+    assert results == list(range(6))
+    assert calls == [[0, 1, 2], [3, 4, 5]]
+    assert stats["batches_sent"] == 2
+    assert stats["average_batch_size"] == 3
+
+
+def test_handler_error_reaches_every_caller():
+    async def handler(items):
+        raise RuntimeError("moderation unavailable")
+
+    async def run():
+        batcher = MicroBatcher(handler, max_wait_ms=1)
+        return await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True
+        )
+
+    errors = asyncio.run(run())
+    assert len(errors) == 2
+    assert all(isinstance(e, RuntimeError) for e in errors)
+
+
+def test_wrong_result_count_fails_the_batch():
+    async def handler(items):
+        return items[:-1]
+
+    async def run():
+        batcher = MicroBatcher(handler, max_wait_ms=1)
+        await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+def test_cancelled_caller_does_not_break_the_batch():
+    async def handler(items):
+        await asyncio.sleep(0.01)
+        return items
+
+    async def run():
+        batcher = MicroBatcher(handler, max_wait_ms=1)
+        cancelled = asyncio.create_task(batcher.submit(1))
+        kept = asyncio.create_task(batcher.submit(2))
+        await asyncio.sleep(0.005)
+        cancelled.cancel()
+        return await kept
+
+    assert asyncio.run(run()) == 2
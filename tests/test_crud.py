@@ -0,0 +1,51 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.db import crud, models
+
+
+def test_history_and_fold_agree_on_message_order(open_db):
+    async def run():
+        async with open_db() as sessions:
+            async with sessions() as db:
+                db.add(models.User(email="parent@example.com"))
+                await db.commit()
+                await crud.create_conversation(db, user_id=1)
+
+                # Write-behind stored the second turn's rows before a retried
+                # batch carrying an earlier request
+                now = datetime.utcnow()
+                for content, created_at in (
+                    ("later", now),
+                    ("earlier", now - timedelta(seconds=5)),
+                    ("latest", now + timedelta(seconds=1)),
+                ):
+                    await crud.create_messages(
+                        db,
+                        [
+                            {
+                                "conversation_id": 1,
+                                "role": "user",
+                                "content": content,
+                                "created_at": created_at,
+                            }
+                        ],
+                    )
+
+                history = await crud.get_conversation_messages(db, 1)
+                pending = await crud.get_messages_after(db, 1, None, limit=10)
+                folded = pending[0].id
+                after_fold = await crud.get_conversation_messages(
+                    db, 1, after_id=folded
+                )
+                page = await crud.get_conversation_messages(
+                    db, 1, limit=1, before_id=history[-1].id
+                )
+
+            return history, pending, after_fold, page
+
+    history, pending, after_fold, page = asyncio.run(run())
+    assert [m.id for m in history] == [m.id for m in pending]
+    # The window after a fold is exactly the messages the fold left out
+    assert [m.content for m in after_fold] == [m.content for m in pending[1:]]
+    assert [m.content for m in page] == ["earlier"]
@@ -0,0 +1,105 @@
+import asyncio
+import gzip
+import json
+
+from app.api.routes import export
+from app.db import crud, models
+
+
+async def seed(db):
+    """Two users; the first has a conversation with no messages between two"""
+    db.add_all([models.User(email="a@example.com"), models.User(email="b@example.com")])
+    await db.commit()
+    for user_id in (1, 2, 1, 1):
+        await crud.create_conversation(db, user_id=user_id)
+    for conversation_id, count in ((1, 3), (2, 1), (4, 2), (1, 1)):
+        await crud.create_messages(
+            db,
+            [
+                {
+                    "conversation_id": conversation_id,
+                    "role": "user",
+                    "content": f"c{conversation_id} m{i}",
+                }
+                for i in range(count)
+            ],
+        )
+
+
+def export_lines(open_db, monkeypatch) -> dict[bool, list[dict]]:
+    """Stream user 1's export both plain and gzipped, decoded to JSON lines"""
+
+    async def run():
+        async with open_db() as sessions:
+            async with sessions() as db:
+                await seed(db)
+
+            monkeypatch.setattr(export, "ReadSessionLocal", sessions)
+            monkeypatch.setattr(export.settings, "export_batch_size", 2)
+            return {
+                compress: [
+                    chunk async for chunk in export._export_stream(1, compress=compress)
+                ]
+                for compress in (False, True)
+            }
+
+    lines = {}
+    for compress, chunks in asyncio.run(run()).items():
+        body = b"".join(chunks)
+        if compress:
+            body = gzip.decompress(body)
+        lines[compress] = [json.loads(line) for line in body.decode().splitlines()]
+    return lines
+
+
+def test_export_rows_come_in_batches(open_db):
+    async def run():
+        async with open_db() as sessions:
+            async with sessions() as db:
+                await seed(db)
+                return [batch async for batch in crud.stream_export_rows(db, 1, 2)]
+
+    batches = asyncio.run(run())
+
+    assert [len(batch) for batch in batches] == [2, 2, 2, 1]
+    rows = [row for batch in batches for row in batch]
+    assert {row["user_id"] for row in rows} == {1}
+    assert [(row["conversation_id"], row["message_id"]) for row in rows] == [
+        (1, 1),
+        (1, 2),
+        (1, 3),
+        (1, 7),
+        (3, None),
+        (4, 5),
+        (4, 6),
+    ]
+
+
+def expected_lines():
+    return [
+        ("conversation", 1),
+        ("message", 1),
+        ("message", 2),
+        ("message", 3),
+        ("message", 7),
+        ("conversation", 3),
+        ("conversation", 4),
+        ("message", 5),
+        ("message", 6),
+    ]
+
+
+def test_ndjson_export_opens_each_conversation_once(open_db, monkeypatch):
+    lines = export_lines(open_db, monkeypatch)[False]
+
+    # Conversation 1 spans two batches and is still opened only once
+    assert [(line["type"], line["id"]) for line in lines] == expected_lines()
+    assert lines[0]["user_id"] == 1
+    assert lines[1]["content"] == "c1 m0"
+    assert lines[5]["title"] is None
+
+
+def test_gzip_export_decompresses_to_the_same_lines(open_db, monkeypatch):
+    lines = export_lines(open_db, monkeypatch)
+
+    assert lines[True] == lines[False]
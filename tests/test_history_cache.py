@@ -0,0 +1,100 @@
+import pytest
+
+from app.services import history_cache
+from app.services.history_cache import HistoryCache
+
+
+def _messages(*contents: str) -> list[dict[str, str]]:
+    return [{"role": "user", "content": content} for content in contents]
+
+
+def _contents(cache: HistoryCache, conversation_id: int) -> list[str]:
+    return [m["content"] for m in cache.get(conversation_id)[1]]
+
+
+def test_appended_turns_are_served_from_cache():
+    cache = HistoryCache(max_messages=3)
+    assert cache.get(1) is None
+
+    cache.put(1, "summary", _messages("a", "b"))
+    cache.append(1, _messages("c", "d"))
+    assert cache.get(1) == ("summary", _messages("b", "c", "d"))
+
+    # Turns of uncached conversations are left for the next database read
+    cache.append(2, _messages("x"))
+    assert cache.get(2) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_fold_drops_summarized_messages():
+    cache = HistoryCache(max_messages=10)
+    cache.put(1, None, _messages("a", "b", "c"))
+    cache.append(1, _messages("d"))
+
+    cache.fold(1, "a to b", folded=2)
+    assert cache.get(1) == ("a to b", _messages("c", "d"))
+
+    cache.fold(1, "a to d", folded=5)
+    assert cache.get(1) == ("a to d", [])
+
+
+def test_fold_counts_messages_beyond_max_messages():
+    cache = HistoryCache(max_messages=2)
+    cache.put(1, None, _messages("a"))
+    cache.append(1, _messages("b", "c", "d"))
+
+    # Four unsummarized messages, two cached: folding the oldest two keeps both
+    cache.fold(1, "a and b", folded=2)
+    assert _contents(cache, 1) == ["c", "d"]
+
+    cache.fold(1, "a to c", folded=1)
+    assert _contents(cache, 1) == ["d"]
+
+
+def test_fold_of_partial_history_invalidates():
+    cache = HistoryCache(max_messages=2)
+    # A full page may have older unsummarized messages behind it
+    cache.put(1, None, _messages("c", "d"), complete=False)
+
+    cache.fold(1, "summary", folded=1)
+    assert cache.get(1) is None
+
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = HistoryCache()
+    cache.put(1, None, _messages("a" * 100))
+    cache.max_bytes = 2 * cache.get_stats()["bytes"]
+
+    cache.put(2, None, _messages("b" * 100))
+    cache.get(1)
+    cache.put(3, None, _messages("c" * 100))
+
+    assert cache.get(2) is None
+    assert cache.get(1) is not None and cache.get(3) is not None
+    assert cache.evictions == 1
+    assert cache.get_stats()["bytes"] <= cache.max_bytes
+
+
+def test_invalidate_and_expiry_release_memory(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(history_cache.time, "monotonic", lambda: now)
+
+    cache = HistoryCache(ttl_seconds=60)
+    cache.put(1, "summary", _messages("a"))
+    cache.put(2, None, _messages("b"))
+
+    cache.invalidate(1)
+    assert cache.get(1) is None
+
+    now += 61
+    assert cache.get(2) is None
+    assert cache.get_stats()["bytes"] == 0
+
+
+@pytest.mark.parametrize("complete", [True, False])
+def test_put_replaces_cached_history(complete):
+    cache = HistoryCache()
+    cache.put(1, "old", _messages("a", "b"))
+    cache.put(1, "new", _messages("c"), complete=complete)
+
+    assert cache.get(1) == ("new", _messages("c"))
@@ -0,0 +1,75 @@
+import math
+
+import pytest
+
+from app.services.lexical_index import BM25Index, tokenize
+
+TEXTS = [
+    "RSV symptoms in babies include coughing and wheezing",
+    "Toddler sleep regression usually passes within weeks",
+    "Feeding schedule for newborn babies",
+    "Sleep training methods for toddlers and babies",
+]
+
+
+def _bm25(query: str, texts: list[str], k1: float = 1.2, b: float = 0.75):
+    """Reference BM25 scores of every text, computed directly"""
+    docs = [tokenize(text) for text in texts]
+    average = sum(len(doc) for doc in docs) / len(docs)
+    scores = []
+    for doc in docs:
+        score = 0.0
+        for term in dict.fromkeys(tokenize(query)):
+            df = sum(term in d for d in docs)
+            tf = doc.count(term)
+            if not tf:
+                continue
+            idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+            norm = 1 - b + b * len(doc) / average
+            score += idf * tf * (k1 + 1) / (tf + k1 * norm)
+        scores.append(score)
+    return scores
+
+
+def test_tokenize_casefolds_and_drops_stopwords():
+    assert tokenize("What is RSV in the Baby?") == ["rsv", "baby"]
+    assert tokenize("x" * 41 + " ok") == ["ok"]
+
+
+@pytest.mark.parametrize("query", ["babies sleep", "RSV", "toddler sleep sleep"])
+def test_scores_match_reference_bm25(query):
+    index = BM25Index.build(TEXTS)
+    expected = _bm25(query, TEXTS)
+
+    results = index.search(query, top_k=len(TEXTS))
+    assert {row for row, _ in results} == {i for i, s in enumerate(expected) if s}
+    for row, score in results:
+        assert score == pytest.approx(expected[row], rel=1e-5)
+
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_rare_terms_outweigh_common_ones():
+    index = BM25Index.build(TEXTS)
+    # "rsv" is in one document, "babies" in three
+    assert index.search("rsv babies", top_k=1)[0][0] == 0
+
+
+def test_unknown_or_stopword_queries_match_nothing():
+    index = BM25Index.build(TEXTS)
+    assert index.search("vaccination") == []
+    assert index.search("what is the") == []
+    assert BM25Index.build([]).search("sleep") == []
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = BM25Index.build(TEXTS, k1=1.5, b=0.5)
+    index.save(tmp_path / "bm25")
+
+    loaded = BM25Index.load(tmp_path / "bm25")
+    assert len(loaded) == len(TEXTS)
+    assert (loaded.k1, loaded.b) == (1.5, 0.5)
+    assert loaded.search("babies sleep", top_k=4) == index.search(
+        "babies sleep", top_k=4
+    )
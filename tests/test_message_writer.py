@@ -0,0 +1,149 @@
+import asyncio
+
+from sqlalchemy import func, select
+
+from app.db import crud, models
+from app.services.message_writer import MessageWriter
+
+
+def _rows(conversation_id: int, count: int) -> list[dict]:
+    return [
+        {"conversation_id": conversation_id, "role": "user", "content": f"m{i}"}
+        for i in range(count)
+    ]
+
+
+async def _seed(sessions):
+    async with sessions() as db:
+        db.add(models.User(email="parent@example.com"))
+        await db.commit()
+        await crud.create_conversation(db, user_id=1)
+        await crud.create_conversation(db, user_id=1)
+
+
+async def _count(sessions) -> int:
+    async with sessions() as db:
+        return await db.scalar(select(func.count()).select_from(models.Message))
+
+
+class FailingSession:
+    """Session factory whose sessions fail to write a set number of times"""
+
+    def __init__(self, sessions, failures: int):
+        self.sessions = sessions
+        self.failures = failures
+
+    def __call__(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database is locked")
+        return self.sessions()
+
+
+def test_concurrent_enqueues_share_one_batch(open_db):
+    committed = []
+
+    async def run():
+        async with open_db() as sessions:
+            await _seed(sessions)
+            writer = MessageWriter(
+                sessions, flush_interval_ms=20, on_commit=committed.append
+            )
+            writer.start()
+            writer.enqueue(_rows(1, 2))
+            writer.enqueue(_rows(2, 2))
+            writer.enqueue(_rows(1, 2))
+            await asyncio.sleep(0.1)
+
+            stats = writer.get_stats()
+            await writer.aclose()
+            async with sessions() as db:
+                conversation = await crud.get_conversation(db, 1)
+            return stats, await _count(sessions), conversation.message_count
+
+    stats, rows, message_count = asyncio.run(run())
+    assert (stats["flushes"], stats["rows_written"], rows) == (1, 6, 6)
+    assert message_count == 4
+    assert committed == [1, 2]
+
+
+def test_full_batch_is_written_without_waiting(open_db):
+    async def run():
+        async with open_db() as sessions:
+            await _seed(sessions)
+            writer = MessageWriter(sessions, max_batch_rows=4, flush_interval_ms=60_000)
+            writer.start()
+            writer.enqueue(_rows(1, 4))
+            await asyncio.sleep(0.1)
+            written = writer.rows_written
+            await writer.aclose()
+            return written
+
+    assert asyncio.run(run()) == 4
+
+
+def test_failed_write_is_retried(open_db):
+    async def run():
+        async with open_db() as sessions:
+            await _seed(sessions)
+            writer = MessageWriter(FailingSession(sessions, failures=2))
+            writer.start()
+            writer.enqueue(_rows(1, 2))
+            await writer.aclose()
+            return writer.get_stats(), await _count(sessions)
+
+    stats, rows = asyncio.run(run())
+    assert (stats["rows_written"], stats["rows_dropped"], rows) == (2, 0, 2)
+
+
+def test_batch_is_dropped_after_max_attempts(open_db):
+    dropped, committed = [], []
+
+    async def run():
+        async with open_db() as sessions:
+            await _seed(sessions)
+            writer = MessageWriter(
+                FailingSession(sessions, failures=MessageWriter.MAX_ATTEMPTS),
+                on_commit=committed.append,
+                on_drop=dropped.append,
+            )
+            writer.start()
+            writer.enqueue(_rows(1, 1) + _rows(2, 1))
+            await writer.aclose()
+            return writer.get_stats(), await _count(sessions)
+
+    stats, rows = asyncio.run(run())
+    assert (stats["rows_written"], stats["rows_dropped"], rows) == (0, 2, 0)
+    assert dropped == [1, 2]
+    assert committed == []
+
+
+def test_close_flushes_pending_rows(open_db):
+    async def run():
+        async with open_db() as sessions:
+            await _seed(sessions)
+            writer = MessageWriter(sessions, flush_interval_ms=60_000)
+            writer.start()
+            writer.enqueue(_rows(1, 3))
+            await writer.aclose()
+            return await _count(sessions)
+
+    assert asyncio.run(run()) == 3
+
+
+def test_enqueue_after_close_is_dropped(open_db):
+    dropped = []
+
+    async def run():
+        async with open_db() as sessions:
+            await _seed(sessions)
+            writer = MessageWriter(sessions, on_drop=dropped.append)
+            writer.start()
+            await writer.aclose()
+
+            writer.enqueue(_rows(1, 2))
+            return writer.get_stats(), await _count(sessions)
+
+    stats, rows = asyncio.run(run())
+    assert (stats["rows_dropped"], rows) == (2, 0)
+    assert dropped == [1]
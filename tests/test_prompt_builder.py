@@ -0,0 +1,98 @@
+import pytest
+
+from app.services import prompt_builder
+from app.services.prompt_builder import (
+    TOKENS_PER_MESSAGE,
+    TOKENS_PER_REPLY,
+    PromptBuilder,
+    TokenCounter,
+)
+
+
+@pytest.fixture
+def counter(monkeypatch) -> TokenCounter:
+    # Length-based estimates keep the arithmetic simple and work offline
+    monkeypatch.setattr(prompt_builder, "_load_encoding", lambda model: None)
+    return TokenCounter()
+
+
+def _prompt_tokens(counter: TokenCounter, messages: list[dict[str, str]]) -> int:
+    return TOKENS_PER_REPLY + sum(counter.count_message(m) for m in messages)
+
+
+def _history(count: int) -> list[dict[str, str]]:
+    return [
+        {"role": "user" if i % 2 else "assistant", "content": f"turn {i:02d} " * 10}
+        for i in range(count)
+    ]
+
+
+def test_history_is_kept_newest_first_within_budget(counter):
+    builder = PromptBuilder(counter, budget_tokens=200)
+    history = _history(20)
+
+    messages, usage = builder.build("System.", "Question?", history=history)
+
+    kept = messages[1:-1]
+    assert 0 < len(kept) < len(history)
+    assert kept == history[-len(kept) :]
+    assert messages[-1] == {"role": "user", "content": "Question?"}
+    assert usage["history_used"] == len(kept)
+    assert usage["prompt_tokens_estimate"] == _prompt_tokens(counter, messages)
+    assert usage["prompt_tokens_estimate"] <= 200
+
+
+def test_summary_and_user_message_always_go_in(counter):
+    builder = PromptBuilder(counter, budget_tokens=30)
+    messages, usage = builder.build(
+        "System.", "Question?", history=_history(5), summary="Earlier: sleep."
+    )
+
+    assert messages[0]["content"].endswith("Earlier: sleep.")
+    assert messages[-1]["content"] == "Question?"
+    assert usage["history_used"] == 0
+
+
+def test_documents_fill_their_share_in_rank_order(counter):
+    documents = [
+        {"content": f"Document {i}. " + "word " * 40, "source": f"doc{i}.md"}
+        for i in range(5)
+    ]
+    builder = PromptBuilder(counter, budget_tokens=300, context_share=0.5)
+
+    messages, usage = builder.build("System.", "Question?", documents=documents)
+
+    system = messages[0]["content"]
+    used = usage["documents_used"]
+    assert 0 < used < len(documents)
+    for i in range(used):
+        assert f"(Source: doc{i}.md)" in system
+    assert f"doc{used}.md" not in system
+    # Entries are counted one by one, so the estimate can only overshoot
+    assert _prompt_tokens(counter, messages) <= usage["prompt_tokens_estimate"] <= 300
+
+
+def test_last_document_is_truncated_to_fit(counter):
+    builder = PromptBuilder(counter)
+    document = {"content": "word " * 200, "source": "long.md"}
+
+    entries = builder.format_documents([document], budget_tokens=100)
+    assert len(entries) == 1
+    assert entries[0].endswith("... (Source: long.md)")
+    assert counter.count(entries[0]) + 1 <= 100
+
+    # Too little room for a useful fragment: left out
+    small = PromptBuilder.MIN_DOCUMENT_TOKENS
+    assert builder.format_documents([document], budget_tokens=small) == []
+
+
+def test_token_counter_caches_counts(counter):
+    counter.max_entries = 2
+    assert counter.count("abcdefgh") == 2
+    assert counter.count_message({"content": "abcd"}) == TOKENS_PER_MESSAGE + 1
+    counter.count("abcdefgh")
+    counter.count("third")
+
+    assert counter.get_stats()["size"] == 2
+    assert (counter.hits, counter.misses) == (1, 3)
+    assert counter.truncate("abcdefghijkl", 2) == "abcdefgh"
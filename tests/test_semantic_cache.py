@@ -0,0 +1,63 @@
+import math
+
+import pytest
+
+from app.services import semantic_cache
+from app.services.semantic_cache import SemanticCache
+
+
+def _at_similarity(cosine: float) -> list[float]:
+    """A vector with the given cosine similarity to [1, 0, 0]"""
+    return [cosine, math.sqrt(1 - cosine**2), 0.0]
+
+
+@pytest.mark.parametrize(
+    ("cosine", "hit"), [(1.0, True), (0.921, True), (0.919, False), (0.5, False)]
+)
+def test_hit_only_at_or_above_threshold(cosine, hit):
+    cache = SemanticCache(threshold=0.92)
+    cache.store([1.0, 0.0, 0.0], "answer")
+
+    assert cache.lookup(_at_similarity(cosine)) == ("answer" if hit else None)
+    assert (cache.hits, cache.misses) == ((1, 0) if hit else (0, 1))
+
+
+def test_lookup_is_scale_invariant_and_picks_the_closest():
+    cache = SemanticCache(threshold=0.9)
+    cache.store([10.0, 0.0, 0.0], "x")
+    cache.store([0.0, 3.0, 0.0], "y")
+
+    assert cache.lookup([0.1, 2.0, 0.0]) == "y"
+    assert cache.lookup([5.0, 0.0, 0.1]) == "x"
+    assert SemanticCache().lookup([1.0, 0.0, 0.0]) is None
+
+
+def test_expired_entries_miss(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: now)
+
+    cache = SemanticCache(ttl_seconds=60)
+    cache.store([1.0, 0.0, 0.0], "answer")
+    assert cache.lookup([1.0, 0.0, 0.0]) == "answer"
+
+    now += 61
+    assert cache.lookup([1.0, 0.0, 0.0]) is None
+
+
+def test_full_cache_evicts_least_recently_used(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: now)
+
+    cache = SemanticCache(max_entries=2)
+    cache.store([1.0, 0.0, 0.0], "x")
+    now += 1
+    cache.store([0.0, 1.0, 0.0], "y")
+    now += 1
+    cache.lookup([1.0, 0.0, 0.0])
+    now += 1
+    cache.store([0.0, 0.0, 1.0], "z")
+
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup([1.0, 0.0, 0.0]) == "x"
+    assert cache.lookup([0.0, 0.0, 1.0]) == "z"
+    assert cache.get_stats()["evictions"] == 1
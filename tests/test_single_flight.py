@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_with_one_key_run_once():
+    runs = 0
+
+    async def fn():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("key", fn) for _ in range(5)))
+        return results, flight.get_stats()
+
+    results, stats = asyncio.run(run())
+    assert results == ["answer"] * 5
+    assert runs == 1
+    assert stats == {"in_flight": 0, "executed": 1, "coalesced": 4}
+
+
+def test_finished_call_is_not_reused():
+    runs = 0
+
+    async def fn():
+        nonlocal runs
+        runs += 1
+        return runs
+
+    async def run():
+        flight = SingleFlight()
+        return await flight.do("key", fn), await flight.do("key", fn)
+
+    assert asyncio.run(run()) == (1, 2)
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    async def fn():
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def run():
+        flight = SingleFlight()
+        first = asyncio.create_task(flight.do("key", fn))
+        second = asyncio.create_task(flight.do("key", fn))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "answer"
+
+
+def test_call_runs_to_completion_when_every_caller_leaves():
+    async def run():
+        done = asyncio.Event()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            done.set()
+
+        flight = SingleFlight()
+        caller = asyncio.create_task(flight.do("key", fn))
+        await asyncio.sleep(0)
+        caller.cancel()
+
+        await asyncio.wait_for(done.wait(), timeout=1)
+        await asyncio.sleep(0)
+        return flight.get_stats()["in_flight"]
+
+    assert asyncio.run(run()) == 0
+
+
+def test_error_reaches_every_caller_and_is_not_cached():
+    runs = 0
+
+    async def fn():
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream failed")
+
+    async def run():
+        flight = SingleFlight()
+        errors = await asyncio.gather(
+            flight.do("key", fn), flight.do("key", fn), return_exceptions=True
+        )
+        retry = await asyncio.gather(flight.do("key", fn), return_exceptions=True)
+        return errors + retry
+
+    errors = asyncio.run(run())
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert runs == 2
@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace as NS
+
+from app.db import crud, models
+from app.services.summarizer import ConversationSummarizer
+
+
+class FakeOpenAI:
+    """Returns a numbered summary and records the messages it was asked to fold"""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def chat_completion(self, messages, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        return NS(
+            choices=[NS(message=NS(content=f" summary {len(self.prompts)} "))],
+            usage=NS(prompt_tokens=100, completion_tokens=20),
+        )
+
+
+async def add_messages(db, count: int, start: int = 0):
+    await crud.create_messages(
+        db,
+        [
+            {"conversation_id": 1, "role": "user", "content": f"message {i}"}
+            for i in range(start, start + count)
+        ],
+    )
+
+
+def run_summarizer(open_db, messages: int, more: int = 0):
+    """Summarize a conversation of `messages` messages, then `more` later ones"""
+    folds = []
+
+    async def run():
+        async with open_db() as sessions:
+            async with sessions() as db:
+                db.add(models.User(email="parent@example.com"))
+                await db.commit()
+                await crud.create_conversation(db, user_id=1)
+                await add_messages(db, messages)
+
+            client = FakeOpenAI()
+            summarizer = ConversationSummarizer(
+                client,
+                sessions,
+                history_window=4,
+                fold_batch=3,
+                on_fold=lambda *args: folds.append(args),
+            )
+            results = [await summarizer.summarize(1)]
+            if more:
+                async with sessions() as db:
+                    await add_messages(db, more, start=messages)
+                results.append(await summarizer.summarize(1))
+
+            async with sessions() as db:
+                conversation = await crud.get_conversation(db, 1)
+            return results, conversation, client, summarizer
+
+    return (*asyncio.run(run()), folds)
+
+
+def test_short_conversation_is_not_folded(open_db):
+    results, conversation, client, summarizer, folds = run_summarizer(open_db, 6)
+
+    assert results == [False]
+    assert conversation.summary is None
+    assert conversation.summarized_message_id is None
+    assert client.prompts == []
+    assert folds == []
+
+
+def test_fold_stores_summary_of_oldest_batch(open_db):
+    results, conversation, client, summarizer, folds = run_summarizer(open_db, 7)
+
+    assert results == [True]
+    assert conversation.summary == "summary 1"
+    assert conversation.summarized_message_id == 3
+    assert folds == [(1, "summary 1", 3)]
+    assert summarizer.get_stats()["messages_folded"] == 3
+
+    prompt = client.prompts[0]
+    assert "(none)" in prompt
+    assert "message 2" in prompt and "message 3" not in prompt
+
+
+def test_next_fold_continues_from_the_boundary(open_db):
+    results, conversation, client, summarizer, folds = run_summarizer(
+        open_db, 7, more=3
+    )
+
+    assert results == [True, True]
+    assert conversation.summary == "summary 2"
+    assert conversation.summarized_message_id == 6
+    assert folds == [(1, "summary 1", 3), (1, "summary 2", 3)]
+
+    prompt = client.prompts[1]
+    assert "summary 1" in prompt
+    assert "message 2" not in prompt
+    assert "message 3" in prompt and "message 5" in prompt
+    assert "message 6" not in prompt
@@ -0,0 +1,113 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from starlette.requests import Request
+
+from app.api.routes.sync import sync
+from app.db import crud, models
+
+
+def _request() -> Request:
+    return Request({"type": "http", "method": "GET", "headers": []})
+
+
+async def _sync(sessions, cursor=None, limit=200) -> dict:
+    async with sessions() as db:
+        response = await sync(_request(), user_id=1, cursor=cursor, limit=limit, db=db)
+    return json.loads(response.body)
+
+
+def _message(content: str, created_at: datetime | None = None) -> dict:
+    created_at = created_at or datetime.utcnow()
+    return {
+        "conversation_id": 1,
+        "role": "user",
+        "content": content,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+async def _seed(sessions):
+    async with sessions() as db:
+        db.add(models.User(email="parent@example.com"))
+        await db.commit()
+        await crud.create_conversation(db, user_id=1, title="Sleep")
+
+
+def test_late_commit_with_old_timestamps_is_synced(open_db):
+    async def run():
+        async with open_db() as sessions:
+            await _seed(sessions)
+            async with sessions() as db:
+                await crud.create_messages(db, [_message("first")])
+
+            first = await _sync(sessions)
+            assert [m["content"] for m in first["messages"]] == ["first"]
+
+            # A write-behind batch stamped a minute ago that only commits
+            # now, after the client's watermark
+            old = datetime.utcnow() - timedelta(minutes=1)
+            async with sessions() as db:
+                await crud.create_messages(db, [_message("late", old)])
+
+            return await _sync(sessions, first["next_cursor"])
+
+    second = asyncio.run(run())
+    assert [m["content"] for m in second["messages"]] == ["late"]
+    # The conversation's counters changed with it
+    assert [c["message_count"] for c in second["conversations"]] == [2]
+
+
+def test_watermark_follows_commit_order(open_db):
+    async def run():
+        async with open_db() as sessions:
+            await _seed(sessions)
+
+            # The first writer takes the sync counter, then stalls before
+            # committing; the second waits on its lock
+            async with sessions() as slow:
+                await crud.next_sync_seq(slow)
+                fast = asyncio.create_task(_write(sessions, "fast"))
+                await asyncio.sleep(0.2)
+                await crud.create_messages(slow, [_message("slow")])
+            await fast
+
+            async with sessions() as db:
+                messages = await crud.get_changed_messages(db, 1, None, 10)
+            return [(m.content, m.sync_seq) for m in messages]
+
+    async def _write(sessions, content):
+        async with sessions() as db:
+            await crud.create_messages(db, [_message(content)])
+
+    (slow, slow_seq), (fast, fast_seq) = asyncio.run(run())
+    assert (slow, fast) == ("slow", "fast")
+    assert slow_seq < fast_seq
+
+
+def test_paging_and_server_side_updates(open_db):
+    async def run():
+        async with open_db() as sessions:
+            await _seed(sessions)
+            async with sessions() as db:
+                await crud.create_messages(db, [_message(f"m{i}") for i in range(5)])
+
+            pages, cursor = [], None
+            while True:
+                page = await _sync(sessions, cursor, limit=2)
+                pages.append([m["content"] for m in page["messages"]])
+                cursor = page["next_cursor"]
+                if not page["has_more"]:
+                    break
+
+            # Summaries are server-side only and must not re-sync
+            async with sessions() as db:
+                await crud.update_conversation_summary(db, 1, "summary", 3)
+            return pages, await _sync(sessions, cursor)
+
+    pages, after_summary = asyncio.run(run())
+    assert sum(pages, []) == [f"m{i}" for i in range(5)]
+    assert after_summary["conversations"] == []
+    assert after_summary["messages"] == []
@@ -0,0 +1,148 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.vector_store import VectorStore, VectorStoreWriter
+
+
+def _rows(n: int, dim: int = 8, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def _docs(hashes: list[str]) -> list[dict]:
+    return [{"content": f"chunk {h}", "hash": h} for h in hashes]
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_appended_rows_round_trip(tmp_path, dtype):
+    vectors = _rows(5)
+    with VectorStoreWriter(tmp_path, dtype=dtype) as writer:
+        writer.append(vectors[:3], _docs(["a", "b", "c"]))
+        writer.append(vectors[3:], _docs(["d", "e"]))
+
+    store = VectorStore.load(tmp_path)
+    assert len(store) == 5
+    assert [doc["hash"] for doc in store.documents] == ["a", "b", "c", "d", "e"]
+
+    expected = VectorStore.normalize_rows(vectors)
+    np.testing.assert_allclose(np.asarray(store.vectors), expected, atol=0.02)
+    assert store.search(vectors[3], top_k=1)[0][0] == 3
+
+    query = expected[1]
+    row, score = store.search(query, top_k=1)[0]
+    assert row == 1
+    assert score == pytest.approx(1.0, abs=0.02)
+
+
+def _query_ms(store: VectorStore, queries: np.ndarray) -> float:
+    """Median per-query search latency"""
+    store.search(queries[0])
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        store.search(query)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def test_default_dtype_searches_as_fast_as_memory(tmp_path):
+    vectors = _rows(20_000, dim=256)
+    queries = _rows(15, dim=256, seed=1)
+
+    in_memory = VectorStore(dim=256)
+    in_memory.add(vectors, [{}] * len(vectors))
+    with VectorStoreWriter(tmp_path, dtype=settings.vector_store_dtype) as writer:
+        writer.append(vectors, [{}] * len(vectors))
+    loaded = VectorStore.load(tmp_path)
+
+    # A loaded store must not re-convert the corpus on every query
+    assert _query_ms(loaded, queries) <= 2 * _query_ms(in_memory, queries) + 1
+
+
+def test_uncommitted_rows_are_truncated_on_open(tmp_path):
+    with VectorStoreWriter(tmp_path, dtype="int8") as writer:
+        writer.append(_rows(2), _docs(["a", "b"]))
+    committed = {
+        name: (tmp_path / name).stat().st_size for name in VectorStoreWriter.DATA_FILES
+    }
+
+    # A run that died after writing data but before committing meta.json
+    for name in VectorStoreWriter.DATA_FILES:
+        with open(tmp_path / name, "ab") as f:
+            f.write(b"\xff" * 13)
+
+    with VectorStoreWriter(tmp_path) as writer:
+        assert writer.count == 2
+        sizes = {
+            name: (tmp_path / name).stat().st_size
+            for name in VectorStoreWriter.DATA_FILES
+        }
+        assert sizes == committed
+
+        # Resuming appends after the committed rows
+        writer.append(_rows(1, seed=1), _docs(["c"]))
+        assert writer.existing_hashes() == {"a", "b", "c"}
+
+    store = VectorStore.load(tmp_path)
+    assert [doc["hash"] for doc in store.documents] == ["a", "b", "c"]
+
+
+def test_rejects_mismatched_dimensions(tmp_path):
+    with VectorStoreWriter(tmp_path) as writer:
+        writer.append(_rows(1), _docs(["a"]))
+        with pytest.raises(ValueError):
+            writer.append(_rows(1, dim=4), _docs(["b"]))
+
+    with pytest.raises(ValueError):
+        VectorStoreWriter(tmp_path, dim=4)
+
+
+def test_compact_keeps_one_row_per_live_hash(tmp_path):
+    vectors = _rows(5)
+    with VectorStoreWriter(tmp_path, dtype="int8") as writer:
+        writer.append(vectors, _docs(["a", "b", "a", "c", "d"]))
+        assert writer.compact({"a", "c", "d"}) == 2
+        assert writer.count == 3
+
+        # The writer stays usable after swapping files
+        writer.append(_rows(1, seed=1), _docs(["e"]))
+
+    store = VectorStore.load(tmp_path)
+    assert [doc["hash"] for doc in store.documents] == ["a", "c", "d", "e"]
+    assert store.search(vectors[3], top_k=1)[0][0] == 1
+    assert not list(tmp_path.glob("*" + VectorStoreWriter.COMPACT_SUFFIX))
+
+
+def test_incomplete_compaction_is_discarded(tmp_path):
+    with VectorStoreWriter(tmp_path) as writer:
+        writer.append(_rows(2), _docs(["a", "b"]))
+
+    # Compacted data written, but its meta never was
+    for name in VectorStoreWriter.DATA_FILES:
+        (tmp_path / (name + VectorStoreWriter.COMPACT_SUFFIX)).write_bytes(b"partial")
+
+    with VectorStoreWriter(tmp_path) as writer:
+        assert writer.count == 2
+    assert not list(tmp_path.glob("*" + VectorStoreWriter.COMPACT_SUFFIX))
+    assert len(VectorStore.load(tmp_path)) == 2
+
+
+def test_complete_compaction_is_finished_on_open(tmp_path):
+    # Build the compacted files in another store, then stage them as a
+    # compaction interrupted after its meta was written
+    with VectorStoreWriter(tmp_path / "compacted") as writer:
+        writer.append(_rows(1, seed=1), _docs(["b"]))
+    with VectorStoreWriter(tmp_path / "store") as writer:
+        writer.append(_rows(2), _docs(["a", "b"]))
+
+    for name in (*VectorStoreWriter.DATA_FILES, VectorStore.META_FILE):
+        source = tmp_path / "compacted" / name
+        target = tmp_path / "store" / (name + VectorStoreWriter.COMPACT_SUFFIX)
+        source.rename(target)
+
+    with VectorStoreWriter(tmp_path / "store") as writer:
+        assert writer.count == 1
+    store = VectorStore.load(tmp_path / "store")
+    assert [doc["hash"] for doc in store.documents] == ["b"]